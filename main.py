@@ -4,7 +4,7 @@ from src.constants import ErrorCorrection
 
 def main():
     #create('0123')
-    create('HELLO WORLD')
+    create('HELLO WORLD').save("QR.png")
     #create('HELLO WORLD', ErrorCorrection.Q, 1)
     #create('HELLO WORLD', ErrorCorrection.H, 1)
     #create('HELLO WORLD', ErrorCorrection.H, 40)
@@ -1,22 +1,42 @@
 """
 ### BitBuffer class ###
+Bits are collected in a number (accumulator) first, then whole bytes are moved into "buffer".
+
 Members
-- buffer: list
-    Contains 8-bit number per item.
+- buffer: bytearray
+    Contains whole 8-bit numbers. Last bits which are not 8 bits yet are kept in accumulator.
 - length: int
-    Number of bits of current buffer.
+    Number of bits of current buffer (including bits in accumulator).
 
 Methods
 - put(int num, int length) -> void
     Put integer "num" into buffer as "length"-bit binary number.
+    "length" can be any size, e.g. many codewords packed in one number.
 - putBit(int bit) -> void
     Put "bit" into buffer at last position.
+- putList(list nums, int length) -> void
+    Put every number of "nums" as "length"-bit binary number, packed into words of about "WordBits" bits.
+- putBytes(bytes data) -> void
+    Put every byte of "data" (bytes, bytearray, memoryview or list of 8-bit numbers).
+    If buffer is at byte boundary, bytes are appended as is.
+- putTerminator(int maxLength) -> void
+    Put terminator (up to 4 0s, not over "maxLength" bits), then 0s to make the length a multiple of 8.
+- putPadBytes(int maxLength) -> void
+    Put 0xEC and 0x11, alternately, until "maxLength" bits.
 - copyList(list byteList) -> void
     Clear all buffer datas and construct new one with list of 8-bit numbers given.
+- copy() -> BitBuffer
+    Create copy of buffer.
+- getBytes() -> bytes
+    Get all datas as bytes. Last bits which are not 8 bits yet are filled with 0s.
+- getView() -> memoryview
+    Get all datas without copy. Slice of it is also not copied.
+    Only when length is a multiple of 8 (raise ValueError if not).
+    Buffer can't be extended while view is used.
 
 Operations
-- = BitBuffer -> BitBuffer
-    Copy all buffer datas into left-hand-side.
+- == BitBuffer -> bool
+    Compare length & all bits.
 - len(BitBuffer obj) -> int
     Get bit length of current buffer.
 - [int n] -> int
@@ -24,6 +44,10 @@ Operations
 """
 
 
+# Size of word packed by putList()
+WordBits = 512
+
+
 ####################################################################################################
 # BitBuffer class
 ####################################################################################################
@@ -34,9 +58,12 @@ class BitBuffer:
     # Declare & initialize variable.
     def __init__(self):
         # Buffer, store each item as 8-bit data.
-        self.buffer = []
+        self.buffer = bytearray()
         # Now buffer's length.
         self.length = 0
+        # Bits not moved into buffer yet (less than 8 bits), and its number of bits.
+        self.accumulator = 0
+        self.accumulatorLength = 0
 
     #--------------------------------------------------
     # Put number in "length"-bit
@@ -45,49 +72,112 @@ class BitBuffer:
     #   length : Length of bit to put number into.
     #--------------------------------------------------
     def put(self, num: int, length: int):
-        # Inverse right-shift loop to find that position bit from left-to-right.
-        for i in range(length):
-            # Determine 'how many position' to shift.
-            shift = (length - i - 1)
+        if length <= 0:
+            return
 
-            # Shift & Check that bit is 1 or 0.
-            bitToPut = (num >> shift) & 1
+        # Append after bits in accumulator.
+        accumulator = (self.accumulator << length) | (num & ((1 << length) - 1))
+        accumulatorLength = self.accumulatorLength + length
+        self.length += length
 
-            # Put that bit into buffer.
-            self.putBit(bitToPut)
+        # Move whole bytes into buffer.
+        remain = accumulatorLength % 8
+        if accumulatorLength >= 8:
+            self.buffer += (accumulator >> remain).to_bytes(accumulatorLength // 8, "big")
+            accumulator &= (1 << remain) - 1
+
+        self.accumulator = accumulator
+        self.accumulatorLength = remain
 
     #--------------------------------------------------
-    # Put each bit in 8-bit index
+    # Put 1 bit
     #--------------------------------------------------
     def putBit(self, bit: int):
-        # Finding now item's index.
-        itemIndex = self.length // 8
+        self.put(1 if bit else 0, 1)
+
+    #--------------------------------------------------
+    # Put many numbers of same length
+    #--------------------------------------------------
+    def putList(self, nums: list, length: int):
+        # Numbers per word (Too long word makes shifting slow).
+        perWord = max(1, WordBits // length)
 
-        # Check no. of items in buffer.
-        # If less than or equal to index, create 0 (to do OR operation).
-        if len(self.buffer) <= itemIndex:
-            self.buffer.append(0)
-        # If bit to store is 1.
-        if bit:
-            # Store after last one.
-            self.buffer[itemIndex] |= (0x80 >> (self.length % 8))
-        # Either 0 or 1, after put it, the length will increased.
-        self.length += 1
+        for start in range(0, len(nums), perWord):
+            part = nums[start:start+perWord]
+            word = 0
+            for num in part:
+                word = (word << length) | num
+            self.put(word, len(part) * length)
 
     #--------------------------------------------------
-    # Copy from type(BitBuffer) using operator =
+    # Put bytes
     #--------------------------------------------------
-    def __eq__(self, other):
-        if isinstance(other, BitBuffer):
-            self.buffer = other.buffer[:]
-            self.length = other.length
+    def putBytes(self, data):
+        # At byte boundary, copy as is (extend() also takes list of 8-bit numbers).
+        if self.accumulatorLength == 0:
+            self.buffer.extend(data)
+            self.length += len(data) * 8
+        else:
+            # from_bytes() reads bytes-like or list as is, no extra copy.
+            self.put(int.from_bytes(data, "big"), len(data) * 8)
+
+    #--------------------------------------------------
+    # Padding
+    #--------------------------------------------------
+    def putTerminator(self, maxLength: int):
+        # Terminator: up to 4 0s.
+        self.put(0, min(4, maxLength - self.length))
+        # Add More 0s to Make the Length a Multiple of 8
+        if self.accumulatorLength != 0:
+            self.put(0, 8 - self.accumulatorLength)
+
+    def putPadBytes(self, maxLength: int):
+        count = (maxLength - self.length) // 8
+        if count > 0:
+            # 236 (0xEC) and 17 (0x11), respectively
+            self.putBytes((b"\xEC\x11" * ((count + 1) // 2))[:count])
 
     #--------------------------------------------------
     # Copy from type(list)
     #--------------------------------------------------
     def copyList(self, byteList: list = []):
-        self.buffer = byteList[:]
-        self.length = len(byteList) * 8
+        self.buffer = bytearray(byteList)
+        self.length = len(self.buffer) * 8
+        self.accumulator = 0
+        self.accumulatorLength = 0
+
+    #--------------------------------------------------
+    # Copy
+    #--------------------------------------------------
+    def copy(self):
+        other = BitBuffer()
+        other.buffer = self.buffer[:]
+        other.length = self.length
+        other.accumulator = self.accumulator
+        other.accumulatorLength = self.accumulatorLength
+        return other
+
+    #--------------------------------------------------
+    # Export
+    #--------------------------------------------------
+    def getBytes(self):
+        if self.accumulatorLength == 0:
+            return bytes(self.buffer)
+        # Last byte, filled with 0s.
+        return bytes(self.buffer) + bytes([self.accumulator << (8 - self.accumulatorLength)])
+
+    def getView(self):
+        if self.accumulatorLength != 0:
+            raise ValueError("Not a multiple of 8 bits: {0} bits".format(self.length))
+        return memoryview(self.buffer)
+
+    #--------------------------------------------------
+    # == BitBuffer
+    #--------------------------------------------------
+    def __eq__(self, other):
+        if not isinstance(other, BitBuffer):
+            return NotImplemented
+        return self.length == other.length and self.getBytes() == other.getBytes()
 
     #--------------------------------------------------
     # Return length of buffer
@@ -99,10 +189,12 @@ class BitBuffer:
     # bitBuffer[n]
     #--------------------------------------------------
     def __getitem__(self, n: int):
-        return self.buffer[n]
+        if 0 <= n < len(self.buffer):
+            return self.buffer[n]
+        return self.getBytes()[n]
 
     #--------------------------------------------------
     # Debug print()
     #--------------------------------------------------
     def __str__(self):
-        return str(self.buffer)
\ No newline at end of file
+        return str(list(self.getBytes()))
@@ -0,0 +1,143 @@
+"""
+### BitMatrix class ###
+Square matrix of bits, packed as one Python int per row.
+Bit "col" of rows[row] (from least significant bit) is the module at (row, col).
+
+Members
+- size: int
+    Width and height of matrix.
+- rows: list
+    Contains "size"-bit number per row.
+
+Methods
+- get(int row, int col) -> bool
+    Get bit at (row, col).
+- set(int row, int col, bool value) -> void
+    Set bit at (row, col) to "value".
+- getRow(int row) -> int
+    Get "size"-bit number of row "row".
+- getColumn(int col) -> int
+    Get "size"-bit number of column "col", bit "row" is the module at (row, col).
+    For many columns, use transpose() once instead.
+- transpose() -> BitMatrix
+    Create transposed copy, so column access becomes row access.
+- copy() -> BitMatrix
+    Create copy of matrix.
+- countBits() -> int
+    Count number of 1 bits in matrix.
+- toLists() -> list[list, list, ...]
+    Convert to 2D Array of lists, contains True, False.
+
+Operations
+- ^ BitMatrix -> BitMatrix
+    XOR row by row.
+- ^= BitMatrix -> BitMatrix
+    XOR row by row in-place.
+- == BitMatrix -> bool
+    Compare size & all bits.
+"""
+
+
+####################################################################################################
+# Count 1 bits of number
+####################################################################################################
+# int.bit_count() since Python 3.10
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:
+    def popcount(num: int):
+        return bin(num).count("1")
+
+
+####################################################################################################
+# BitMatrix class
+####################################################################################################
+class BitMatrix:
+    #--------------------------------------------------
+    # Constructor
+    #
+    # Parameters:
+    #   size: Width and height of matrix.
+    #   rows: List of "size"-bit numbers. If None is given, all bits are 0.
+    #--------------------------------------------------
+    def __init__(self, size: int, rows: list = None):
+        self.size = size
+        if rows is None:
+            self.rows = [0] * size
+        else:
+            self.rows = rows
+
+    #--------------------------------------------------
+    # Get/Set bit
+    #--------------------------------------------------
+    def get(self, row: int, col: int):
+        return ((self.rows[row] >> col) & 1) == 1
+
+    def set(self, row: int, col: int, value: bool):
+        if value:
+            self.rows[row] |= (1 << col)
+        else:
+            self.rows[row] &= ~(1 << col)
+
+    #--------------------------------------------------
+    # Row & Column
+    #--------------------------------------------------
+    def getRow(self, row: int):
+        return self.rows[row]
+
+    def getColumn(self, col: int):
+        num = 0
+        for row in range(self.size):
+            num |= ((self.rows[row] >> col) & 1) << row
+        return num
+
+    #--------------------------------------------------
+    # Transposed copy
+    #--------------------------------------------------
+    def transpose(self):
+        # Bit strings with column 0 at first character,
+        # then let zip() swap rows & columns in one go.
+        strings = [format(num, "0{0}b".format(self.size))[::-1] for num in self.rows]
+        return BitMatrix(self.size, [int("".join(bits)[::-1], 2) for bits in zip(*strings)])
+
+    #--------------------------------------------------
+    # Copy
+    #--------------------------------------------------
+    def copy(self):
+        return BitMatrix(self.size, self.rows[:])
+
+    #--------------------------------------------------
+    # Count 1 bits
+    #--------------------------------------------------
+    def countBits(self):
+        return sum(map(popcount, self.rows))
+
+    #--------------------------------------------------
+    # Convert to 2D Array
+    #--------------------------------------------------
+    def toLists(self):
+        return [[((num >> col) & 1) == 1 for col in range(self.size)] for num in self.rows]
+
+    #--------------------------------------------------
+    # ^ BitMatrix
+    #--------------------------------------------------
+    def __xor__(self, other):
+        return BitMatrix(self.size, [a ^ b for a, b in zip(self.rows, other.rows)])
+
+    def __ixor__(self, other):
+        self.rows = [a ^ b for a, b in zip(self.rows, other.rows)]
+        return self
+
+    #--------------------------------------------------
+    # == BitMatrix
+    #--------------------------------------------------
+    def __eq__(self, other):
+        if not isinstance(other, BitMatrix):
+            return NotImplemented
+        return self.size == other.size and self.rows == other.rows
+
+    #--------------------------------------------------
+    # Debug print()
+    #--------------------------------------------------
+    def __str__(self):
+        return "\n".join("".join("1" if bit else "0" for bit in row) for row in self.toLists())
@@ -1,5 +1,4 @@
 from enum import Enum
-import re # regex
 
 #****************************************************************************************************
 #------------------------------
@@ -11,16 +10,6 @@ class ErrorCorrection(Enum):
         return self.value
 
 
-#------------------------------
-# Regular Expression
-#   [...]   Matches any single character in brackets.
-#   *       Matches 0 or more occurrences of preceding expression.
-#   $       Matches end of line.
-#------------------------------
-Numeric_Regex = re.compile("[0-9]*$")
-AlphaNum_Regex = re.compile("[0-9A-Z $%*+-./:]*$")
-
-
 #------------------------------
 # Mode Indicator
 #------------------------------
@@ -34,6 +23,18 @@ class ModeIndicator(Enum):
         return self.value
 
 
+#------------------------------
+# Mask Selection Policy
+#------------------------------
+class MaskPolicy(Enum):
+    FULL        = 0 # Lowest penalty score of all 4 rules (ISO/IEC 18004)
+    FAST        = 1 # Lowest penalty score of rules #2 & #4 only
+    SMALLEST    = 2 # Fewest horizontal dark runs, for smallest rendered output
+    FIXED       = 3 # Mask number given by caller (mask 0 if not given)
+    def __int__(self):
+        return self.value
+
+
 #------------------------------
 # Character Count Indicator
 #------------------------------
@@ -45,6 +46,9 @@ EncodeSize_M = [12, 11, 16, 10]
 # Version 27 - 40
 EncodeSize_L = [14, 13, 16, 12]
 
+# (First version, Last version) of each size above
+VersionGroups = [(1, 9), (10, 26), (27, 40)]
+
 
 #------------------------------
 # Number of bits for numeric data lengths
@@ -61,12 +65,6 @@ NumericLength = { 3 : 10, 2 : 7, 1 : 4 }
 AlphaNum = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
 
 
-#------------------------------
-# Hexadecimal
-#------------------------------
-HexNum = '0123456789abcdef'
-
-
 #------------------------------
 # Remainder Bits
 #------------------------------
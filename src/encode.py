@@ -1,9 +1,11 @@
 from bisect import bisect_left
+from time import perf_counter
 from src.BitBuffer import BitBuffer
 from src.constants import *
 from src.rsBlocks import *
-from src.gf256 import Polynomial
-from src.look_up_table import CapacityTable, GeneratorPolynomial
+from src.segment import *
+from src.gf256 import rsEncodeBlocks
+from src import url
 from src.module_placement import QR
 
 """
@@ -11,25 +13,64 @@ from src.module_placement import QR
 Create QR Code
 
 Parameters
-- dataString: str
+- dataString: str, bytes, bytearray or memoryview
     String data to encode.
+    Bytes-like data is encoded in byte mode as is (no decoding), copied only into the bit buffer.
+    Multi-dimensional or non-byte memoryview is read as flat bytes.
 - ecLevel: constants.ErrorCorrection
     Error correction level.
-    If None is given, automatically encode at level H.
+    If None is given, automatically encode at level H (level L if "boostEcLevel" is True).
 - version: int
     Version to encode.
     If None is given, automatically detect best version to fit data.
-
-
-### areAllCharKanji() function ###
-Check all characters are Kanji or not.
-
-Return "True" if all characters are multibyte Kanji on Rikai's Shift JIS Kanji Code Table.
-Return "False" if any character is NOT Kanji found.
+- pool: multiprocessing.Pool, concurrent.futures.Executor, or etc.
+    Workers to test mask patterns. Reused by caller across create() calls.
+    If True is given, use library-owned Pool (see module_placement.getPool()).
+    If None is given, score all mask patterns together in this process.
+- mask: int or constants.MaskPolicy
+    Mask number (0 to 7) to use, or policy to choose it.
+    If None is given, choose by lowest penalty score (MaskPolicy.FULL).
+- timeBudget: float
+    Seconds from calling create() to finish QR Code.
+    If mask selection is expected to be late, cheaper mask policy is used (see QR.degraded).
+    Expected time is measured one of each version (scaled from other versions if not measured yet),
+    plus first-time building of mask deltas for the version & level.
+- segment: bool
+    If True, split string into numeric, alphanumeric, byte and kanji segments with fewest bits
+    (see segment.makeSegments()). Smaller version may be used.
+    If False, encode whole string in 1 mode.
+- boostEcLevel: bool
+    If True, "ecLevel" is minimum level. Version is chosen at that level,
+    then level is raised as long as data still fits in the same version (see QR.errorCorrection).
+- shiftJis: bool
+    If True, bytes-like data is Shift-JIS text. It is encoded in kanji mode if all characters are Kanji
+    (byte pairs are read directly), else in byte mode as is.
+- normalizeUrl: bool
+    If True, uppercase case-insensitive parts of URL string before choosing modes (see url.normalizeUrl()),
+    so more characters go into alphanumeric segments.
+    Bits & versions saved by it are reported as QR.savedBits & QR.savedVersions.
+
+Return
+- module_placement.QR
+    QR Code symbol (version, error correction level, chosen mask & policy, modules).
+    Call save() or makeImage() on it to render.
+
+
+### findVersion() function ###
+Find smallest version which data fits, by exact bit length and data capacity index (rsBlocks.DataBitsByLevel).
 
 Parameters
-- dataString: str
-    String data to encode.
+- getSegments: function(int version) -> list
+    Return list of segment.Segment to encode in "version".
+- ecLevel: constants.ErrorCorrection
+    Error correction level.
+- getMinBitLength: function(int version) -> int
+    Return lower bound of bit length in "version" (without making segments).
+    Version group which can't fit it is skipped. If None is given, every group makes segments.
+
+Return
+- tuple(int, list)
+    Version & segments. (None, None) if data is too large.
 
 
 ### structFinalMsg() function ###
@@ -46,12 +87,21 @@ Parameters
 ####################################################################################################
 # Create QR Code
 ####################################################################################################
-def create(dataString: str, ecLevel: ErrorCorrection = None, version: int = None):
+def create(dataString: str, ecLevel: ErrorCorrection = None, version: int = None, pool = None, mask = None,
+           timeBudget: float = None, segment: bool = True, boostEcLevel: bool = False, shiftJis: bool = False,
+           normalizeUrl: bool = False):
+    #------------------------------
+    # Deadline
+    #------------------------------
+    deadline = None
+    if timeBudget is not None:
+        deadline = perf_counter() + timeBudget
+
     #------------------------------
     # Auto Error Correction Level
     #------------------------------
     if ecLevel is None:
-        ecLevel = ErrorCorrection.H
+        ecLevel = ErrorCorrection.L if boostEcLevel else ErrorCorrection.H
 
     #------------------------------
     # Check Version
@@ -59,218 +109,95 @@ def create(dataString: str, ecLevel: ErrorCorrection = None, version: int = None
     if version is not None and (version < 1 or version > 40):
         raise ValueError("Wrong version!!")
 
-    #------------------------------
-    # Create Bit Buffer
-    #------------------------------
-    buff = BitBuffer()
-
     # Find string length
-    strlen = len(dataString)
-    if strlen == 0:
+    if len(dataString) == 0:
         raise ValueError("Try to encode 0 byte data")
 
     #------------------------------
-    # Find mode to encode by check data type
+    # URL Normalization
     #------------------------------
-    mode = 0
-    # * NOT use isdigit() or isnumeric() or isdecimal() for checking Numeric.
-    #   reason is written in README.md
-    if Numeric_Regex.match(dataString) is not None:
-        mode = int(ModeIndicator.NUMERIC)
-    elif AlphaNum_Regex.match(dataString) is not None:
-        mode = int(ModeIndicator.ALPHANUM)
-    elif areAllCharKanji(dataString):
-        mode = int(ModeIndicator.KANJI)
-    else:
-        mode = int(ModeIndicator.BYTE)
+    original = None
+    if normalizeUrl and isinstance(dataString, str):
+        normalized = url.normalizeUrl(dataString)
+        if normalized != dataString:
+            original = dataString
+            dataString = normalized
 
     #------------------------------
-    # Find best fit version or check specific version
+    # Split data into segments & Find best fit version or check specific version
     #------------------------------
-    # Create list of capacities in every mode by version from error correction level.
-    listByVersion = [CapacityTable[i] for i in range(int(ecLevel), len(CapacityTable), 4)]
-
-    # Create capacity list in specific mode
-    capacityList = []
-    if mode == int(ModeIndicator.NUMERIC):
-        capacityList = list(map(lambda x: x[0], listByVersion))
-    elif mode == int(ModeIndicator.ALPHANUM):
-        capacityList = list(map(lambda x: x[1], listByVersion))
-    elif mode == int(ModeIndicator.BYTE):
-        capacityList = list(map(lambda x: x[2], listByVersion))
-    else:
-        capacityList = list(map(lambda x: x[3], listByVersion))
+    getSegments, getMinBitLength = _getSegmentsFunction(dataString, segment, shiftJis)
+
+    # Before changed by version search & EC level raise.
+    autoVersion = version is None
+    minLevel = ecLevel
 
     # If version is not given.
     if version is None:
-        # Get version by searching index to insert data.
-        version = bisect_left(capacityList, len(dataString)) + 1
+        version, segments = findVersion(getSegments, ecLevel, getMinBitLength)
 
         # End of list. Not found suitable one.
-        if version > 40:
+        if version is None:
             raise OverflowError("Data Overflow!")
 
     # Else, check data capacity
     else:
-        if strlen > capacityList[version - 1]:
-            raise OverflowError("Data Overflow! Data length = {0}, Capacity = {1}".format(strlen, capacityList[version - 1]))
+        segments = getSegments(version)
+        bitLength = getSegmentsBitLength(segments, version)
+        maxbit = getDataBits(version, ecLevel)
+        if bitLength > maxbit:
+            raise OverflowError("Data Overflow! Data length = {0} bits, Capacity = {1} bits".format(bitLength, maxbit))
 
-    # Clear memory.
-    del capacityList, listByVersion
+    #------------------------------
+    # Raise Error Correction Level while data fits in same version
+    #------------------------------
+    if boostEcLevel:
+        bitLength = getSegmentsBitLength(segments, version)
+        for level in range(int(ecLevel) + 1, len(ErrorCorrection)):
+            if bitLength > getDataBits(version, ErrorCorrection(level)):
+                break
+            ecLevel = ErrorCorrection(level)
 
     #------------------------------
-    # Pre-encode Data
+    # Bits & Versions saved by URL Normalization
     #------------------------------
-    # Mode Indicator
-    buff.put((1 << mode), 4)
-
-    # Character Count Indicator
-    charin = 0
-    if version <= 9:
-        charin = EncodeSize_S[mode]
-    elif version <= 26:
-        charin = EncodeSize_M[mode]
-    else:
-        charin = EncodeSize_L[mode]
-    buff.put(strlen, charin)
+    savedBits = 0
+    savedVersions = 0
+    if original is not None:
+        getOriginalSegments, getOriginalMinBitLength = _getSegmentsFunction(original, segment, shiftJis)
+        savedBits = getSegmentsBitLength(getOriginalSegments(version), version) - getSegmentsBitLength(segments, version)
+        if autoVersion:
+            originalVersion = findVersion(getOriginalSegments, minLevel, getOriginalMinBitLength)[0]
+            savedVersions = None if originalVersion is None else originalVersion - version
 
-    # Clear memory.
-    del strlen, charin
-    
     #------------------------------
     # Encode Data
     #------------------------------
-    # Numeric
-    if mode == int(ModeIndicator.NUMERIC):
-        for i in range(0, len(dataString), 3):
-            # Data to convert
-            numStr = dataString[i:i+3]
-            # Put into buffer.
-            buff.put(int(numStr), NumericLength[len(numStr)])
-
-        # Clear memory.
-        del numStr
-
-    # Alphanumeric
-    elif mode == int(ModeIndicator.ALPHANUM):
-        # Loop for every 2 characters.
-        for i in range(0, len(dataString), 2):
-            # substr every 2 positions.
-            char = dataString[i:i+2]
-
-            # Check length
-            # 2 characters
-            if len(char) > 1:
-                # Get numeric representation these 2 characters & calculate.
-                num = AlphaNum.find(char[0]) * 45 + AlphaNum.find(char[1])
-                # Put into buffer.
-                buff.put(num, 11)
-            # 1 character
-            else:
-                # Get numeric representation that character.
-                num = AlphaNum.find(char[0])
-                # Put into buffer.
-                buff.put(num, 6)
-
-        # Clear memory.
-        del char, num
-
-    # Byte
-    elif mode == int(ModeIndicator.BYTE):
-        charNums = []
-        # Convert string to UTF-8 (make sure that this data can be encoded for QR).
-        utf8 = dataString.encode("utf-8")
-
-        # Store in list
-        for char in utf8:
-            charNums.append(char)
-
-        # Put each character for 1 byte one-by-one.
-        for c in charNums:
-            # Put into buffer.
-            buff.put(c, 8)
-
-        # Clear memory
-        del c, char, charNums, utf8
-
-    # Kanji
-    else:
-        for i in range(len(dataString)):
-            # Convert to Shift-JIS
-            encodedChar = dataString[i].encode("shift-jis")
-            # Get HEX value as string.
-            encodedChar = encodedChar.hex()
-
-            # Convert from string to number.
-            num = (HexNum.find(encodedChar[0]) << 12 |
-                    HexNum.find(encodedChar[1]) << 8 |
-                    HexNum.find(encodedChar[2]) << 4 |
-                    HexNum.find(encodedChar[3]))
-        
-            # In ranges 0x8140 to 0x9FFC
-            if (num >= 0x8140 and num <= 0x9FFC):
-                num -= 0x8140
-            # In ranges 0xE040 to 0xEBBF
-            elif (num >= 0xE040 and num <= 0xEBBF):
-                num -= 0xC140
-
-            # Most significant byte
-            MSB = ((num >> 8) & 0xFF)
-            # Least significant byte
-            LSB = (num & 0xFF)
-
-            # Calculate.
-            num = (MSB * 0xC0) + LSB
-            # Put into buffer.
-            buff.put(num, 13)
-
-        # Clear memory.
-        del encodedChar, num, MSB, LSB
+    buff = BitBuffer()
+    putSegments(buff, segments, version)
 
     # Clear memory.
-    del mode
-    
+    del segments, getSegments, getMinBitLength
+
     #------------------------------
     # Determine the Required Number of Bits for this QR Code
     #------------------------------
+    # Data always fits, since version is chosen by exact bit length.
     blocks = blockInfo(version, ecLevel)
-    maxbit = 0
-    for i in range(len(blocks)):
-        maxbit += blocks[i].noDataCodeword * 8
-    if len(buff) > maxbit:
-        raise MemoryError("Capacity Overflow")
-    
-    #------------------------------
-    # Add a Terminator
-    #------------------------------
-    if len(buff) < maxbit:
-        diff = maxbit - len(buff)
-        if diff >= 4:
-            buff.put(0, 4)
-        else:
-            buff.put(0, diff)
+    maxbit = getDataBits(version, ecLevel)
 
     #------------------------------
-    # Add More 0s to Make the Length a Multiple of 8
+    # Add a Terminator & More 0s to Make the Length a Multiple of 8
     #------------------------------
-    remain = len(buff) % 8
-    if remain != 0:
-        buff.put(0, 8 - remain)
-
-    # Clear memory.
-    del remain
+    buff.putTerminator(maxbit)
 
     #------------------------------
     # Add Pad Bytes if the String is Still too Short
     #------------------------------
-    diff = maxbit - len(buff)
-    if diff > 0:
-        fill = [0b11101100, 0b00010001] # 236 (0xEC) and 17 (0x11), respectively
-        for i in range(diff // 8):
-            buff.put(fill[i % 2], 8)
+    buff.putPadBytes(maxbit)
 
     # Clear memory.
-    del maxbit, diff, i
+    del maxbit
 
     #------------------------------
     # Error Correction Coding & Structure Final Message
@@ -289,7 +216,10 @@ def create(dataString: str, ecLevel: ErrorCorrection = None, version: int = None
     #------------------------------
     # Create
     #------------------------------
-    QR(msg, ecLevel, version)
+    qr = QR(msg, ecLevel, version, pool, mask, deadline)
+    qr.savedBits = savedBits
+    qr.savedVersions = savedVersions
+    return qr
 
 
     ## Debug
@@ -300,43 +230,43 @@ def create(dataString: str, ecLevel: ErrorCorrection = None, version: int = None
 
 
 ####################################################################################################
-# Check all string are Kanji character or not
-#
-# Return "True" if all characters are multibyte Kanji on Rikai's Shift JIS Kanji Code Table
-# Return "False" if contain Non-Kanji at least 1 character
+# Segments of data in each version
 ####################################################################################################
-def areAllCharKanji(dataString: str):
-    for i in range(len(dataString)):
-        encodedChar = b''
-        # Try to encode to Shift-JIS
-        try:
-            encodedChar = dataString[i].encode("shift-jis")
-        # Can't encode
-        except UnicodeEncodeError:
-            return False
-
-        # Get HEX value as string
-        encodedChar = encodedChar.hex()
-
-        # Check Length
-        if len(encodedChar) != 4:
-            return False
-
-        # Convert from string to number
-        num = (HexNum.find(encodedChar[0]) << 12 |
-                HexNum.find(encodedChar[1]) << 8 |
-                HexNum.find(encodedChar[2]) << 4 |
-                HexNum.find(encodedChar[3]))
-        
-        # In ranges 0x8140 to 0x9FFC and 0xE040 to 0xEBBF
-        if (num >= 0x8140 and num <= 0x9FFC) or (num >= 0xE040 and num <= 0xEBBF):
-            # OK
+def _getSegmentsFunction(dataString, segment: bool, shiftJis: bool):
+    # Bytes-like data is always 1 segment, and so is numeric string (it's optimal).
+    if not segment or isinstance(dataString, (bytes, bytearray, memoryview)) or getStringClass(dataString) == CharClassNumeric:
+        singleSegment = makeSingleSegment(dataString, shiftJis)
+        return (lambda version: singleSegment, None)
+    else:
+        # Costs of characters are same for all versions, calculate once.
+        charCosts = getCharCosts(dataString)
+        # Every character in its cheapest mode, in 1 segment of cheapest header.
+        minDataBits = -(-sum([min(costs) for costs in charCosts]) // 6)
+        return (lambda version: makeSegments(dataString, version, charCosts),
+                lambda version: minDataBits + min([4 + getCountBits(mode, version) for mode in Modes]))
+
+
+####################################################################################################
+# Find smallest version which data fits
+####################################################################################################
+def findVersion(getSegments, ecLevel: ErrorCorrection, getMinBitLength = None):
+    capacities = DataBitsByLevel[int(ecLevel)]
+
+    for first, last in VersionGroups:
+        # Can't fit even the largest version of group, skip making segments.
+        if getMinBitLength is not None and getMinBitLength(first) > capacities[last - 1]:
             continue
-        else:
-            return False
 
-    # All are Kanji
-    return True
+        # Segments & bit length are same in group (same character count indicator size).
+        segments = getSegments(first)
+        bitLength = getSegmentsBitLength(segments, first)
+
+        # Search in group.
+        version = bisect_left(capacities, bitLength, first - 1, last) + 1
+        if version <= last:
+            return (version, segments)
+
+    return (None, None)
 
 
 ####################################################################################################
@@ -351,8 +281,13 @@ def structFinalMsg(buffer: BitBuffer, blockInfos: list):
 
     # Count for index in buffer
     totalDataCount = 0
+    # Slices of it are not copied.
+    data = buffer.getView()
+
+    # Blocks of same size: (noDataCodeword, noEcCodeword) -> list of block index
+    groups = {}
 
-    # Calculate EC codewords, then fill data & ec table
+    # Fill data table
     for block in range(len(blockInfos)):
         noDataCodeword = blockInfos[block].noDataCodeword
         noEcCodeword = blockInfos[block].noEcCodeword
@@ -362,26 +297,21 @@ def structFinalMsg(buffer: BitBuffer, blockInfos: list):
         maxEcCount = max(maxEcCount, noEcCodeword)
 
         # Copy 'Data' to table
-        dataTable[block] = buffer.buffer[totalDataCount : totalDataCount + noDataCodeword]
+        dataTable[block] = data[totalDataCount : totalDataCount + noDataCodeword]
         totalDataCount += noDataCodeword
-        
-        # EC Coding
-        msg = Polynomial(dataTable[block][:], noEcCodeword) # Shifted message
 
-        # Use Look Up Table for speed run
-        if noEcCodeword in GeneratorPolynomial:
-            gen = Polynomial(GeneratorPolynomial[noEcCodeword])
-        else:
-            gen = Polynomial.getGenerator(noEcCodeword)
-        ecCodeword = msg % gen
+        groups.setdefault((noDataCodeword, noEcCodeword), []).append(block)
 
-        # Copy 'EC Codeword' to table
-        ecTable[block] = ecCodeword[:]
+    # EC Coding of each group at once & Copy 'EC Codeword' to table
+    for (noDataCodeword, noEcCodeword), indices in groups.items():
+        ecCodewords = rsEncodeBlocks([dataTable[block] for block in indices], noEcCodeword)
+        for block, ecCodeword in zip(indices, ecCodewords):
+            ecTable[block] = ecCodeword
 
     #------------------------------
     # Interleave the Data Codewords & Error Correction Codewords
     #------------------------------
-    interleaved = []
+    interleaved = bytearray()
 
     # Data Codewords
     for column in range(maxDataCount):
@@ -399,5 +329,5 @@ def structFinalMsg(buffer: BitBuffer, blockInfos: list):
 
     # Output
     output = BitBuffer()
-    output.copyList(interleaved)
+    output.putBytes(interleaved)
     return output
\ No newline at end of file
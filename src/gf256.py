@@ -1,3 +1,10 @@
+# Optional: NumPy backend for batched encoding
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 """
 Galois Field a.k.a. GF
 
@@ -5,6 +12,16 @@ Galois Field a.k.a. GF
 Log Antilog table of finite field GF(256)
 
 
+### EXP_TABLE_DOUBLE ###
+EXP_TABLE repeated twice (510 items).
+Sum of 2 alpha notations (0 ~ 508) can be looked up without modulo.
+
+
+### MUL_TABLE ###
+Product table, MUL_TABLE[a][b] is a * b in GF(256).
+Each MUL_TABLE[a] is 256 bytes, so it can be given to bytes.translate() to multiply all bytes by "a".
+
+
 ### exp2int() function ###
 Get value of alpha notations.
 
@@ -22,6 +39,34 @@ Parameters
     Where n is value in range 1 to 255
 
 
+### gfMul() / gfDiv() function ###
+Multiply / Divide 2 values in GF(256).
+gfDiv() raises ZeroDivisionError if divisor is 0.
+
+
+### scaleBytes() function ###
+Multiply every byte of "vector" by "factor" in GF(256), in one bytes.translate().
+
+Parameters
+- vector: bytes or bytearray
+- factor: int
+    Value in range 0 to 255
+
+Return
+- bytes
+
+
+### xorBytes() function ###
+Add (XOR) 2 same length vectors in GF(256).
+
+Parameters
+- a: bytes or bytearray
+- b: bytes or bytearray
+
+Return
+- bytes
+
+
 ### Polynomial class ###
 Members
 - coefficients: list
@@ -45,9 +90,61 @@ Operations
 - % Polynomial -> Polynomial
     Modulate other Polynomial using GF(256).
     Return the remainder as Polynomial
+
+
+### Generator Polynomial Cache ###
+Generator polynomial of any number of error correction codewords "n" is built on first use, then kept.
+Polynomial.getGenerator() also reads it.
+
+- getGeneratorCoefficients(int n) -> bytes
+    Coefficients, from leading 1 (a0 * x^n) to x^0 term.
+- getGeneratorLog(int n) -> list
+    Alpha notations of coefficients, without leading 1.
+- getGeneratorRows(int n) -> list
+    Generator polynomial (without leading 1) multiplied by every value 0 ~ 255, as "n" bytes numbers.
+
+
+### rsEncode() function ###
+Calculate error correction codewords with shift register (LFSR), without recursion.
+Same as Polynomial(data, ecCount) % Polynomial.getGenerator(ecCount).
+Register is kept as one number, so each data codeword costs 1 shift, 1 look up and 1 XOR.
+
+Parameters
+- data: bytes, bytearray or list
+    Data codewords.
+- ecCount: int
+    Number of error correction codewords.
+
+Return
+- bytearray
+    Error correction codewords.
+
+
+### rsEncodeBlocks() function ###
+Calculate error correction codewords of many same length blocks at once (e.g. blocks of many symbols).
+With NumPy, every block is done together, 1 data column at a time, by log/exp table gather.
+Without NumPy (or "useNumpy" is False), each block is done by rsEncode().
+
+Parameters
+- blocks: list or numpy.ndarray
+    List of data codewords (bytes, bytearray or list), all same length.
+    Or 2D uint8 array, 1 block per row.
+- ecCount: int
+    Number of error correction codewords.
+
+Return
+- list or numpy.ndarray
+    List of bytearray, 1 per block. Or 2D uint8 array if "blocks" is array.
 """
 
 
+# Use NumPy backend or not.
+useNumpy = numpy is not None
+
+# Use NumPy backend from this number of blocks (fewer blocks are faster by rsEncode()).
+NumpyMinBlocks = 32
+
+
 ####################################################################################################
 # Exponent of a in GF(256) / Galois Field 256
 ####################################################################################################
@@ -79,6 +176,14 @@ LOG_TABLE = list(range(256))
 for i in range(255):
     LOG_TABLE[EXP_TABLE[i]] = i
 
+# Exponent of a (0 ~ 509) -> Integer
+EXP_TABLE_DOUBLE = EXP_TABLE[:255] * 2
+
+# Integer * Integer -> Integer
+MUL_TABLE = [bytes(256)]
+for a in range(1, 256):
+    MUL_TABLE.append(bytes([0] + [EXP_TABLE_DOUBLE[LOG_TABLE[a] + LOG_TABLE[b]] for b in range(1, 256)]))
+
 ####################################################################################################
 # Get data from table
 ####################################################################################################
@@ -90,6 +195,26 @@ def int2exp(n: int):
     return LOG_TABLE[n]
 
 
+####################################################################################################
+# Field & Vector Operations
+####################################################################################################
+def gfMul(a: int, b: int):
+    return MUL_TABLE[a][b]
+
+def gfDiv(a: int, b: int):
+    if b == 0:
+        raise ZeroDivisionError("Error! Divide by 0 in GF(256)")
+    if a == 0:
+        return 0
+    return EXP_TABLE_DOUBLE[LOG_TABLE[a] + 255 - LOG_TABLE[b]]
+
+def scaleBytes(vector, factor: int):
+    return bytes(vector).translate(MUL_TABLE[factor])
+
+def xorBytes(a, b):
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(len(a), "big")
+
+
 ####################################################################################################
 # GF(256) Polynomial
 ####################################################################################################
@@ -141,16 +266,17 @@ class Polynomial:
     # * Polynomial
     #--------------------------------------------------
     def __mul__(self, other):
-        # Create blank list.
-        coef = [0] * (len(self) + len(other) - 1)
+        # Blank product.
+        length = len(self) + len(other) - 1
+        coef = bytes(length)
+        otherBytes = bytes(other.coefficients)
 
-        # Index & Item Loop.
+        # Add (XOR) other * item, shifted by index.
         for i, item in enumerate(self):
-            for j, otherItem in enumerate(other):
-                # Addition in GF(256) is performed by XOR.
-                coef[i + j] ^= exp2int(int2exp(item) + int2exp(otherItem))
+            shifted = bytes(i) + scaleBytes(otherBytes, item) + bytes(length - i - len(other))
+            coef = xorBytes(coef, shifted)
 
-        return Polynomial(coef)
+        return Polynomial(list(coef))
 
     #--------------------------------------------------
     # % Polynomial
@@ -165,13 +291,12 @@ class Polynomial:
         if diff < 0:
             return self
 
-        firstTermExpDiff = int2exp(self[0]) - int2exp(other[0])
+        # Cancel first term (first term of dividend may be 0 after termShift).
+        factor = gfDiv(self[0], other[0])
 
         # Create copied list.
         coef = self[:]
-        
-        for i, (item, otherItem) in enumerate(zip(self, other)):
-            coef[i] = item ^ exp2int(int2exp(otherItem) + firstTermExpDiff)
+        coef[:len(other)] = xorBytes(bytes(coef[:len(other)]), scaleBytes(bytes(other.coefficients), factor))
 
         # Recursive until can't divide.
         return Polynomial(coef) % other
@@ -183,14 +308,123 @@ class Polynomial:
     #   n: Error Correction Codewords
     #--------------------------------------------------
     def getGenerator(n: int):
-        # Create a0 = 1 as initial polynomial.
-        poly = Polynomial([1])
-        for i in range(n):
-            poly = poly * Polynomial([1, exp2int(i)])
-        return poly
+        return Polynomial(list(getGeneratorCoefficients(n)))
 
     #--------------------------------------------------
     # Debug
     #--------------------------------------------------
     def __str__(self):
-        return str(self.coefficients)
\ No newline at end of file
+        return str(self.coefficients)
+
+
+####################################################################################################
+# Reed-Solomon Encoder
+####################################################################################################
+#--------------------------------------------------
+# Generator Polynomial Cache
+#--------------------------------------------------
+# n -> (coefficients, alpha notations, rows)
+_generatorCache = {}
+
+def _getGeneratorEntry(n: int):
+    entry = _generatorCache.get(n)
+    if entry is None:
+        # Create a0 = 1 as initial polynomial.
+        poly = b"\x01"
+        for i in range(n):
+            # poly * (x + a^i) = (poly * x) + (poly * a^i)
+            poly = xorBytes(poly + b"\x00", b"\x00" + scaleBytes(poly, EXP_TABLE[i]))
+
+        # Leading coefficient is always 1.
+        genLog = [LOG_TABLE[coef] for coef in poly[1:]]
+        rows = [int.from_bytes(scaleBytes(poly[1:], factor), "big") for factor in range(256)]
+
+        entry = (poly, genLog, rows)
+        _generatorCache[n] = entry
+    return entry
+
+def getGeneratorCoefficients(n: int):
+    return _getGeneratorEntry(n)[0]
+
+def getGeneratorLog(n: int):
+    return _getGeneratorEntry(n)[1]
+
+def getGeneratorRows(n: int):
+    return _getGeneratorEntry(n)[2]
+
+
+#--------------------------------------------------
+# Encode 1 block
+#--------------------------------------------------
+def rsEncode(data, ecCount: int):
+    rows = getGeneratorRows(ecCount)
+    # Shift register, holds remainder so far. First term at most significant byte.
+    register = 0
+    leadShift = (ecCount - 1) * 8
+    allBits = (1 << (ecCount * 8)) - 1
+
+    for byte in data:
+        # Leading term to be cancelled.
+        factor = byte ^ (register >> leadShift)
+        # Shift by 1 term, then subtract (XOR) generator * factor.
+        register = ((register << 8) & allBits) ^ rows[factor]
+
+    return bytearray(register.to_bytes(ecCount, "big"))
+
+
+#--------------------------------------------------
+# Encode many blocks
+#--------------------------------------------------
+def rsEncodeBlocks(blocks, ecCount: int):
+    isArray = numpy is not None and isinstance(blocks, numpy.ndarray)
+
+    if useNumpy and (isArray or len(blocks) >= NumpyMinBlocks):
+        if isArray:
+            data = blocks
+        else:
+            data = numpy.frombuffer(b"".join([bytes(block) for block in blocks]), dtype=numpy.uint8)
+            data = data.reshape(len(blocks), -1)
+        ecTable = _numpyEncodeBlocks(data, ecCount)
+        return ecTable if isArray else [bytearray(row.tobytes()) for row in ecTable]
+
+    if isArray:
+        ecTable = [rsEncode(block.tolist(), ecCount) for block in blocks]
+        return numpy.frombuffer(b"".join(ecTable), dtype=numpy.uint8).reshape(-1, ecCount)
+    return [rsEncode(block, ecCount) for block in blocks]
+
+
+#--------------------------------------------------
+# NumPy backend
+#--------------------------------------------------
+# Alpha notation of 0 points after EXP_TABLE_DOUBLE, where every value is 0,
+# so product with 0 needs no special case.
+_LogZero = 510
+
+# n -> 256 x n array, row "factor" is generator (without leading 1) * factor
+_generatorArrayCache = {}
+
+def _getGeneratorArray(n: int):
+    rows = _generatorArrayCache.get(n)
+    if rows is None:
+        logArray = numpy.array([_LogZero] + LOG_TABLE[1:], dtype=numpy.int16)
+        expArray = numpy.array(EXP_TABLE_DOUBLE + [0] * 256, dtype=numpy.uint8)
+        genLog = numpy.array(getGeneratorLog(n), dtype=numpy.int16)
+        # Gather exp of (log of factor + log of coefficient) for every factor at once.
+        rows = expArray[logArray[:, None] + genLog]
+        _generatorArrayCache[n] = rows
+    return rows
+
+def _numpyEncodeBlocks(data, ecCount: int):
+    rows = _getGeneratorArray(ecCount)
+    blockCount, dataCount = data.shape
+
+    # Long division of all blocks in place, message shifted by "ecCount" terms.
+    work = numpy.zeros((blockCount, dataCount + ecCount), dtype=numpy.uint8)
+    work[:, :dataCount] = data
+
+    for column in range(dataCount):
+        # Leading terms are cancelled by subtracting (XOR) generator * leading term.
+        work[:, column + 1 : column + 1 + ecCount] ^= rows[work[:, column]]
+
+    # Remainders.
+    return work[:, dataCount:]
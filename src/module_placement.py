@@ -1,8 +1,12 @@
-from PIL import Image
 from math import floor, ceil
-from builtins import next
-from multiprocessing import Pool
+from multiprocessing import Pool, current_process
+from time import perf_counter
+import atexit
+import os
 from src.BitBuffer import BitBuffer
+from src.BitMatrix import BitMatrix
+from src import penalty
+from src.penalty import *
 from src.constants import *
 from src.look_up_table import AlignmentPosition
 
@@ -13,14 +17,68 @@ Calculate & return penalty score.
 
 Parameters
 - args: tuple
-    args is tuple of (BitBuffer dataBuffer, ErrorCorrection errorCorrection, int version, int maskNumber) respectively.
+    args is tuple of (Module base, int maskNumber) respectively.
+    Where "base" is unmasked Module (maskNumber is None).
+
+
+### getPool() function ###
+Get library-owned multiprocessing.Pool.
+Pool is created at first call, then reused by every QR until shutdownPool() is called.
+In forked child process, Pool of parent is not used (its worker handler threads don't exist there), new one is created.
+
+
+### shutdownPool() function ###
+Close & join library-owned Pool (if any, and only if created in this process).
+Also called automatically at interpreter exit.
 
 
 ### QR class ###
 Main QR construction class.
 Test all 8 mask patterns and create the best one.
+By default, all 8 mask patterns are scored together in this process (Module.calcMaskPenaltyScores()).
+They are tested in "pool" given by caller, or in library-owned Pool from getPool() if pool is True.
+Inside worker process (daemonic process can't have children), library-owned Pool is not used.
+Nothing is rendered or written until makeImage() or save() is called.
+
+Members
+- version: int
+    Version of QR Code.
+- errorCorrection: constants.ErrorCorrection
+    Error Correction Level of QR Code.
+- size: int
+    Module size (width and height) of QR Code.
+- maskNumber: int
+    Chosen mask pattern, from 0 to 7.
+- maskPolicy: constants.MaskPolicy
+    How mask pattern was chosen.
+- degraded: bool
+    True if cheaper policy than requested one was used to meet the deadline.
+- penaltyScore: int
+    Penalty score of the chosen mask pattern (MaskPolicy.FULL only, else None).
+- skippedRules: int
+    Number of penalty rule evaluations skipped by branch and bound (see Module.selectMask()).
+- module: Module
+    Module of the chosen mask pattern.
+- modules: BitMatrix
+    Shortcut to module.modules.
+- savedBits: int
+    Bits saved by URL normalization (see encode.create()), 0 if not normalized.
+- savedVersions: int
+    Versions saved by URL normalization, 0 if not normalized or version is given.
+    None if data doesn't fit in any version without normalization.
 
 Methods
+- selectMask(Module base, pool, mask, float deadline) -> void
+    Choose mask pattern of unmasked Module "base" by "mask" (mask number or constants.MaskPolicy).
+    If "deadline" is given, fall back to cheaper policy when "mask" policy is expected to be late.
+    Time of each policy is measured per version and averaged to estimate next one.
+- selectMaskByPolicy(Module base, pool, constants.MaskPolicy mask) -> void
+    Choose mask pattern of unmasked Module "base" by "mask" policy.
+- makeImage(int imageSize) -> PIL.Image
+    Render QR Code (with 1-module white border) as "imageSize" x "imageSize" image.
+    Pillow is imported only when this method is called.
+- save(str fileName, int imageSize) -> void
+    Render QR Code and save it as PNG file "fileName".
 - int2rgb(int value) -> tuple(R, G, B)
     Convert "value" number to tuple as R, G, B values.
 - int2rgba(int value) -> tuple(R, G, B, A)
@@ -37,13 +95,25 @@ Members
     Error Correction Level of QR Code.
 - size: int
     Module size (width and height) of QR Code.
-- modules: list[list, list, ...]
-    2D Array of lists.
-    Contains None, True, False as flag for drawing dark (black) or light (white) module.
+- maskNumber: int
+    Mask pattern, from 0 to 7. None for unmasked Module.
+- modules: BitMatrix
+    Bit-packed matrix, 1 for drawing dark (black) module and 0 for light (white) module.
+- functions: BitMatrix
+    Bit-packed matrix, 1 for function pattern & reserved (format/version information) modules.
+    Data are placed only on 0 modules.
 
 Methods
 - makeModule(BitBuffer dataBuffer, int maskNumber) -> void
     Create QR Code from "dataBuffer" with mask pattern "maskNumber".
+    Function patterns are copied from getFunctionTemplate().
+- makeMasked(int maskNumber) -> Module
+    Create copy of unmasked Module with mask pattern "maskNumber" & its format information.
+- makeFunctionPatterns() -> void
+    Paint function patterns only & reserve format information area.
+    Used when "dataBuffer" is None.
+- setFunction(int row, int col, bool dark) -> void
+    Paint function pattern module at "row" and "col", and mark it as function module.
 - paintFinderSeparatorPattern(int row, int col) -> void
     Paint finder separator pattern at "row" and "col" where "row" and "col" are Top-Left of pattern.
 - paintAlignmentPattern() -> void
@@ -52,6 +122,8 @@ Methods
     Paint timing pattern.
 - paintFormatInfo(int maskNumber) -> void
     Paint format information with mask "maskNumber".
+- paintFormatBits(int dataToWrite) -> void
+    Paint 15 bits format information string "dataToWrite".
 - paintVersionInfo() -> void
     Paint version information (when version is 7 or above).
 - paintDatas(BitBuffer dataBuffer, int maskNumber) -> void
@@ -64,8 +136,22 @@ Methods
 - get18bitsVersionString() -> int
     Create 18 bits version information string.
 
+- packModules() -> tuple(int, int)
+    Pack modules into one number for rows and columns, respectively (see penalty.py).
+- toArray() -> numpy.ndarray
+    Unpack modules into 2D bool array for NumPy backend (see penalty.py).
 - calcPenaltyScore() -> int
     Calculate total penalty score with 4 rules.
+- calcMaskPenaltyScores(tuple rules) -> list
+    For unmasked Module, calculate total penalty scores of all 8 mask patterns in one pass.
+    Same as [makeMasked(i).calcPenaltyScore() for i in range(8)] if all rules are given.
+    Use NumPy backend if penalty.useNumpy is True, only for rules #2 & #4 from version NumpyMinVersion
+    (it is slower than packed-int engine in other cases).
+- calcMaskDarkRuns() -> list
+    For unmasked Module, count horizontal runs of dark modules of all 8 mask patterns.
+- selectMask() -> tuple(int, int, int)
+    For unmasked Module, find best mask pattern by branch and bound.
+    Return (penalty score, mask number, number of skipped rule evaluations).
 - calcPenaltyScoreRule1() -> int
     Calculate penalty score using rule #1.
 - calcPenaltyScoreRule2() -> int
@@ -76,6 +162,50 @@ Methods
     Calculate penalty score using rule #4.
 
 
+### getFunctionTemplate() function ###
+Get Module which has only function patterns of "version" painted.
+Both "modules" and "functions" of it are built once per version, then copied by every Module.
+
+Parameters
+- version: int
+    Version of QR Code.
+
+
+### getDataPath() function ###
+Get list of (row, col) of data modules of "version" in placement order
+(2-column zigzag from bottom-right, skipping function modules).
+Built once per version.
+
+Parameters
+- version: int
+    Version of QR Code.
+
+
+### getMaskPlanes() function ###
+Get list of 8 BitMatrix, one per mask pattern, of "version".
+Each is 1 where its mask pattern toggles a data module (function modules are always 0).
+Built once per version.
+
+Parameters
+- version: int
+    Version of QR Code.
+
+
+### getMaskDeltas() function ###
+Get (masked ^ unmasked) modules of all 8 mask patterns side by side, as
+(packed rows, packed columns) (see penalty.py).
+Same for every unmasked Module of same version & error correction level, so built once per them.
+
+Parameters
+- base: Module
+    Unmasked Module.
+
+
+### getMaskDeltaArrays() function ###
+Same as getMaskDeltas(), as 8 x size x size NumPy array (for NumPy backend).
+Built at first use only, since only calcMaskPenaltyScores() uses it when NumPy backend is faster.
+
+
 ### getMaskPatternFunc() function ###
 Get lambda function of specific mask pattern.
 
@@ -89,90 +219,287 @@ Parameters
 # Multiprocessing Pool Function
 ####################################################################################################
 def getPenaltyScore(args: tuple):
-    dataBuffer, errorCorrection, version, maskNumber = args
-    # Create module.
-    module = Module(dataBuffer, errorCorrection, version, maskNumber)
+    base, maskNumber = args
+    # Create masked module from unmasked one.
+    module = base.makeMasked(maskNumber)
     # Calculate penalty score.
     score = module.calcPenaltyScore()
     # Wrapped it with mask pattern.
     return (score, maskNumber)
 
 
+####################################################################################################
+# Library-owned Pool
+####################################################################################################
+# Created at first use & reused by every QR.
+_pool = None
+# Process ID which created _pool.
+_poolPid = None
+
+def getPool():
+    global _pool, _poolPid
+    # Inherited from parent by fork, can't be used.
+    if _pool is not None and _poolPid != os.getpid():
+        _pool = None
+    if _pool is None:
+        _pool = Pool()
+        _poolPid = os.getpid()
+    return _pool
+
+def shutdownPool():
+    global _pool
+    if _pool is not None:
+        # Parent's Pool is joined by parent.
+        if _poolPid == os.getpid():
+            _pool.close()
+            _pool.join()
+        _pool = None
+
+# Don't leave worker processes behind.
+atexit.register(shutdownPool)
+
+
+####################################################################################################
+# Mask Selection Time
+####################################################################################################
+# Policies to try in order, when deadline is given.
+DegradePolicies = {
+    MaskPolicy.FULL:        (MaskPolicy.FULL, MaskPolicy.FAST, MaskPolicy.FIXED),
+    MaskPolicy.FAST:        (MaskPolicy.FAST, MaskPolicy.FIXED),
+    MaskPolicy.SMALLEST:    (MaskPolicy.SMALLEST, MaskPolicy.FIXED),
+    MaskPolicy.FIXED:       (MaskPolicy.FIXED,),
+}
+
+# (version, MaskPolicy, pooled) -> Estimated seconds
+_maskTimes = {}
+
+# Seconds per module to build mask deltas (getMaskDeltas()), first guess then measured one.
+_deltaTimePerModule = 5e-7
+
+# NumPy backend is used for calcMaskPenaltyScores() of rules #2 & #4 from this version.
+NumpyMinVersion = 10
+
+
+#--------------------------------------------------
+# Estimated seconds of mask selection by "policy" (mask deltas are built already)
+#   Not measured in "version": measured one of nearest version, scaled by number of modules.
+#   Not measured in any version: None
+#--------------------------------------------------
+def _estimateMaskTime(version: int, policy: MaskPolicy, pooled: bool):
+    estimate = _maskTimes.get((version, policy, pooled))
+    if estimate is not None:
+        return estimate
+
+    measured = [(abs(key[0] - version), key[0], seconds) for key, seconds in _maskTimes.items()
+                if key[1] == policy and key[2] == pooled]
+    if not measured:
+        return None
+    distance, measuredVersion, seconds = min(measured)
+    return seconds * ((version * 4) + 17) ** 2 / ((measuredVersion * 4) + 17) ** 2
+
+#--------------------------------------------------
+# Policy needs mask deltas (getMaskDeltas()) or not
+#   FULL with Pool scores each masked module in worker.
+#--------------------------------------------------
+def _usesMaskDeltas(policy: MaskPolicy, pooled: bool):
+    return policy != MaskPolicy.FIXED and not (policy == MaskPolicy.FULL and pooled)
+
+
 ####################################################################################################
 # QR
 ####################################################################################################
 class QR:
-    def __init__(self, dataBuffer: BitBuffer, errorCorrection: ErrorCorrection, version: int):
+    #--------------------------------------------------
+    # Constructor
+    #
+    # Parameters:
+    #   pool: Object which has map() (multiprocessing.Pool, concurrent.futures.Executor, ...).
+    #     None or False: Score all mask patterns together in this process.
+    #     True: Use library-owned Pool.
+    #   mask: Mask number 0 to 7, or constants.MaskPolicy.
+    #     None: MaskPolicy.FULL
+    #   deadline: time.perf_counter() value to finish mask selection by.
+    #     If expected time of "mask" policy is over, use cheaper one (see DegradePolicies).
+    #--------------------------------------------------
+    def __init__(self, dataBuffer: BitBuffer, errorCorrection: ErrorCorrection, version: int, pool = None, mask = None, deadline: float = None):
         #------------------------------
-        # Size
+        # Assign variable to member
         #------------------------------
-        size = (version * 4) + 17 # Equivalent to (((version - 1) * 4) + 21)
+        self.version = version
+        self.errorCorrection = errorCorrection
+        self.size = (version * 4) + 17 # Equivalent to (((version - 1) * 4) + 21)
+
+        # Rendered image (1 pixel per module), created by makeImage() when needed.
+        self.canvas = None
+
+        # Set by create() when URL is normalized.
+        self.savedBits = 0
+        self.savedVersions = 0
         
         #------------------------------
-        # Test for every mask patterns & find the best one
-        # using multiprocessing.Pool for speed run.
+        # Place data only once, then each mask pattern is only XOR & format bits.
+        #------------------------------
+        base = Module(dataBuffer, errorCorrection, version, None)
+
         #------------------------------
-        # Create Pool
-        pool = Pool()
+        # Choose mask pattern
+        #------------------------------
+        self.selectMask(base, pool, mask, deadline)
+
+        # Make the chosen one (XOR & format bits only).
+        self.module = base.makeMasked(self.maskNumber)
+
 
-        # Calculate all 8 patterns
-        scores = pool.map(getPenaltyScore, [(dataBuffer, errorCorrection, version, i) for i in range(8)])
+    #--------------------------------------------------
+    # Choose mask pattern by policy
+    #
+    # Parameters:
+    #   base: Unmasked Module.
+    #   (pool, mask & deadline are same as constructor)
+    #--------------------------------------------------
+    def selectMask(self, base, pool = None, mask = None, deadline: float = None):
+        global _deltaTimePerModule
 
-        # Wait for finished
-        pool.close()
-        pool.join()
+        # Only MaskPolicy.FULL has complete penalty score.
+        self.penaltyScore = None
+        self.skippedRules = 0
+        self.degraded = False
 
-        # Find minimum & take its value
-        minPenaltyScore = min(scores)
-        bestMask = minPenaltyScore[1]
+        if mask is None:
+            mask = MaskPolicy.FULL
 
         #------------------------------
-        # Make the best one
+        # Fixed
         #------------------------------
-        module = Module(dataBuffer, errorCorrection, version, bestMask)
-        
-        #--------------------------------------------------
-        # Simple one. In version 40, slower than Pool() about 32 times
-        #bestMask = 0
-        #minPenaltyScore = 0
-        #for i in range(8):
-        #    # Create QR.
-        #    module = Module(dataBuffer, errorCorrection, version, i)
-        #    # Calculate penalty score.
-        #    penaltyScore = module.calcPenaltyScore()
-        #
-        #    # First loop or found better one.
-        #    if i == 0 or penaltyScore < minPenaltyScore:
-        #        minPenaltyScore = penaltyScore
-        #        bestMask = i
-        #
-        ##------------------------------
-        ## Real Making
-        ##------------------------------
-        ## Best mask is not last one, make it again!
-        #if bestMask != 7:
-        #    module = Module(dataBuffer, errorCorrection, version, bestMask)
-        #--------------------------------------------------
+        if not isinstance(mask, MaskPolicy):
+            # bool is int, but not mask number.
+            if not isinstance(mask, int) or isinstance(mask, bool) or mask not in range(8):
+                raise ValueError("No Mask Number {0}".format(mask))
+            self.maskPolicy = MaskPolicy.FIXED
+            self.maskNumber = mask
+            return
+
+        # Pool's worker can't use library-owned Pool (see selectMaskByPolicy()).
+        pooled = bool(pool) and not (pool is True and current_process().daemon)
 
         #------------------------------
-        # Draw
+        # Deadline: Take the first policy expected to finish in time,
+        # including building mask deltas if not built yet for this version & level.
+        # Never measured one (in any version) takes only mask deltas building time.
         #------------------------------
-        # White BG.
-        bg = self.int2rgb(0xFFFFFF)
-        # Blank Canvas with White Border
-        canvas = Image.new("RGB", (size+2, size+2), bg)
-        
-        # Put data into each module.
-        for i in range(len(module.modules)):
-            for j in range(len(module.modules[i])):
-                if module.modules[i][j] is not None:
-                    canvas.putpixel((j+1,i+1), self.int2rgb(0) if module.modules[i][j] else self.int2rgb(0xFFFFFF))
+        if deadline is not None:
+            policies = DegradePolicies[mask]
+            if perf_counter() >= deadline:
+                # Already late, take the cheapest one.
+                policy = policies[-1]
+            else:
+                coldDeltas = (self.version, self.errorCorrection) not in _maskDeltaCache
+                for policy in policies:
+                    estimate = _estimateMaskTime(self.version, policy, pooled) or 0
+                    if coldDeltas and _usesMaskDeltas(policy, pooled):
+                        estimate += _deltaTimePerModule * self.size * self.size
+                    if perf_counter() + estimate <= deadline:
+                        break
+            self.degraded = (policy != mask)
+            mask = policy
+
+        # Build mask deltas (once per version & level) before measuring, so it isn't in the estimate of policy.
+        if _usesMaskDeltas(mask, pooled) and (self.version, self.errorCorrection) not in _maskDeltaCache:
+            start = perf_counter()
+            getMaskDeltas(base)
+            _deltaTimePerModule = (perf_counter() - start) / (self.size * self.size)
+
+        start = perf_counter()
+        self.selectMaskByPolicy(base, pool, mask)
+
+        # Average with previous one.
+        elapsed = perf_counter() - start
+        key = (self.version, mask, pooled)
+        estimate = _maskTimes.get(key)
+        _maskTimes[key] = elapsed if estimate is None else (estimate + elapsed) / 2
+
+
+    def selectMaskByPolicy(self, base, pool, mask: MaskPolicy):
+        self.maskPolicy = mask
+
+        if mask == MaskPolicy.FIXED:
+            self.maskNumber = 0
+
+        #------------------------------
+        # Rules #2 & #4 only (cheapest rules, no column is needed)
+        #------------------------------
+        elif mask == MaskPolicy.FAST:
+            scores = base.calcMaskPenaltyScores((2, 4))
+            self.maskNumber = min(range(8), key=lambda i: (scores[i], i))
+
+        #------------------------------
+        # Fewest rectangles to draw
+        #------------------------------
+        elif mask == MaskPolicy.SMALLEST:
+            runs = base.calcMaskDarkRuns()
+            self.maskNumber = min(range(8), key=lambda i: (runs[i], i))
+
+        #------------------------------
+        # Test for every mask patterns & find the best one
+        #------------------------------
+        else:
+            # Daemonic process (e.g. Pool's worker) is not allowed to create Pool.
+            if pool is True:
+                pool = None if current_process().daemon else getPool()
+
+            # Calculate all 8 patterns
+            if pool:
+                scores = list(pool.map(getPenaltyScore, [(base, i) for i in range(8)]))
+                # Find minimum & take its value
+                self.penaltyScore, self.maskNumber = min(scores)
+            else:
+                # Branch and bound, skip patterns which can't be the best.
+                self.penaltyScore, self.maskNumber, self.skippedRules = base.selectMask()
+
+
+    #--------------------------------------------------
+    # Bit-packed modules of the chosen mask
+    #--------------------------------------------------
+    @property
+    def modules(self):
+        return self.module.modules
+
+
+    #****************************************************************************************************
+    #--------------------------------------------------
+    # Draw
+    #
+    # Parameters:
+    #   imageSize: Width and height of output image in pixels.
+    #--------------------------------------------------
+    def makeImage(self, imageSize: int = 400):
+        # Import here, so Pillow is needed only when rendering.
+        from PIL import Image
+
+        # Draw only once, then reuse it for every image size.
+        if self.canvas is None:
+            # White BG.
+            bg = self.int2rgb(0xFFFFFF)
+            # Blank Canvas with White Border
+            canvas = Image.new("RGB", (self.size+2, self.size+2), bg)
+            
+            # Put dark modules (background is already white).
+            for i, row in enumerate(self.modules.toLists()):
+                for j, dark in enumerate(row):
+                    if dark:
+                        canvas.putpixel((j+1,i+1), self.int2rgb(0))
+
+            self.canvas = canvas
 
         # Resize
-        canvas = canvas.resize((400, 400), Image.NEAREST)
+        return self.canvas.resize((imageSize, imageSize), Image.NEAREST)
 
-        # Save
-        canvas.save("QR.png", "PNG", optimize=True)
+
+    #--------------------------------------------------
+    # Draw & Save as PNG file
+    #--------------------------------------------------
+    def save(self, fileName: str = "QR.png", imageSize: int = 400):
+        self.makeImage(imageSize).save(fileName, "PNG", optimize=True)
 
 
     #****************************************************************************************************
@@ -197,8 +524,13 @@ class Module:
         self.version = version
         self.errorCorrection = errorCorrection
         self.size = (version * 4) + 17 # Equivalent to (((version - 1) * 4) + 21)
+        self.maskNumber = maskNumber
 
-        self.makeModule(dataBuffer, maskNumber)
+        # No data -> Function patterns only (template of this version).
+        if dataBuffer is None:
+            self.makeFunctionPatterns()
+        else:
+            self.makeModule(dataBuffer, maskNumber)
 
 
     #****************************************************************************************************
@@ -207,14 +539,58 @@ class Module:
     #
     # Parameters:
     #   maskNumber: Mask pattern number 0 to 7.
+    #     None: Leave data unmasked & format information blank (base of makeMasked()).
     #--------------------------------------------------
     def makeModule(self, dataBuffer: BitBuffer, maskNumber: int = 0):
         #------------------------------
-        # Create or Overwritten it as None / 2D Array
+        # Copy function patterns from template of this version
         #------------------------------
-        self.modules = [None] * self.size
-        for row in range(self.size):
-            self.modules[row] = [None] * self.size
+        template = getFunctionTemplate(self.version)
+        self.modules = template.modules.copy()
+        self.functions = template.functions.copy()
+
+        #------------------------------
+        # Format Information (depends on error correction level & mask)
+        #------------------------------
+        if maskNumber is not None:
+            self.paintFormatInfo(maskNumber)
+
+        #------------------------------
+        # Paint Datas
+        #------------------------------
+        self.paintDatas(dataBuffer, maskNumber)
+
+
+    #--------------------------------------------------
+    # Make masked copy of unmasked Module
+    #
+    # Parameters:
+    #   maskNumber: Mask pattern number 0 to 7.
+    #--------------------------------------------------
+    def makeMasked(self, maskNumber: int):
+        module = Module.__new__(Module)
+        module.version = self.version
+        module.errorCorrection = self.errorCorrection
+        module.size = self.size
+        module.maskNumber = maskNumber
+
+        # Toggle whole data area by mask, one XOR per row.
+        module.modules = self.modules ^ getMaskPlanes(self.version)[maskNumber]
+        module.functions = self.functions.copy()
+        module.paintFormatInfo(maskNumber)
+
+        return module
+
+
+    #--------------------------------------------------
+    # Make Function Patterns (depend on version only)
+    #--------------------------------------------------
+    def makeFunctionPatterns(self):
+        #------------------------------
+        # Create or Overwritten it as blank matrices
+        #------------------------------
+        self.modules = BitMatrix(self.size)
+        self.functions = BitMatrix(self.size)
 
         #------------------------------
         # Paint Patterns
@@ -228,21 +604,24 @@ class Module:
         # Timing Patterns
         self.paintTimingPattern()
         # Dark Module
-        self.modules[(self.version*4)+9][8] = True
+        self.setFunction((self.version*4)+9, 8, True)
 
         #------------------------------
         # Format & Version Information Area
         #------------------------------
-        # Format Infos.
-        self.paintFormatInfo(maskNumber)
+        # Reserve Format Infos (painted by makeModule()).
+        self.paintFormatBits(0)
         # Version Infos (Version 7 or above)
         if self.version >= 7:
             self.paintVersionInfo()
 
-        #------------------------------
-        # Paint Datas
-        #------------------------------
-        self.paintDatas(dataBuffer, maskNumber)
+
+    #--------------------------------------------------
+    # Paint function module
+    #--------------------------------------------------
+    def setFunction(self, row: int, col: int, dark: bool):
+        self.modules.set(row, col, dark)
+        self.functions.set(row, col, True)
 
 
     #--------------------------------------------------
@@ -269,10 +648,10 @@ class Module:
                     (2 <= r and r <= 4 and 2 <= c and c <= 4) # Middle 3x3
                     ):
                     # Black
-                    self.modules[row + r][col + c] = True
+                    self.setFunction(row + r, col + c, True)
                 else:
                     # White
-                    self.modules[row + r][col + c] = False
+                    self.setFunction(row + r, col + c, False)
 
 
     #--------------------------------------------------
@@ -290,7 +669,7 @@ class Module:
                 col = pos[j]
 
                 # Check if finder pattern placed -> Nothing to do with this position.
-                if self.modules[row][col] is not None:
+                if self.functions.get(row, col):
                     continue
 
                 # Else, loop for drawing.
@@ -303,10 +682,10 @@ class Module:
                             (r == 0 and c == 0) # Middle
                             ):
                             # Black
-                            self.modules[row + r][col + c] = True
+                            self.setFunction(row + r, col + c, True)
                         else:
                             # White
-                            self.modules[row + r][col + c] = False
+                            self.setFunction(row + r, col + c, False)
 
     
     #--------------------------------------------------
@@ -315,21 +694,15 @@ class Module:
     def paintTimingPattern(self):
         # Vertical loop from 8 ~ size - 9
         for row in range(8, self.size - 8):
-            if self.modules[row][6] is not None:
+            if self.functions.get(row, 6):
                 continue
-            if (row % 2) == 0:
-                self.modules[row][6] = True
-            else:
-                self.modules[row][6] = False
+            self.setFunction(row, 6, (row % 2) == 0)
 
         # Horizontal loop
         for col in range(8, self.size - 8):
-            if self.modules[6][col] is not None:
+            if self.functions.get(6, col):
                 continue
-            if (col % 2) == 0:
-                self.modules[6][col] = True
-            else:
-                self.modules[6][col] = False
+            self.setFunction(6, col, (col % 2) == 0)
 
     
     #--------------------------------------------------
@@ -338,29 +711,31 @@ class Module:
     def paintFormatInfo(self, maskNumber: int):
         # Format String
         first5bits = (ECDic[self.errorCorrection] << 3) | maskNumber
-        dataToWrite = self.get15bitsFormatString(first5bits)
+        self.paintFormatBits(self.get15bitsFormatString(first5bits))
+
 
+    def paintFormatBits(self, dataToWrite: int):
         # Vertical
         for row in range(15):
             # dataToWrite: Bit from left to right are most significant bit and least significant bit, respectively.
             write = ((dataToWrite >> row) & 1) == 1
 
             if row < 6:
-                self.modules[row][8] = write
+                self.setFunction(row, 8, write)
             elif row < 8: # Skip timing
-                self.modules[row+1][8] = write
+                self.setFunction(row+1, 8, write)
             else: # Bottom Line
-                self.modules[self.size-15+row][8] = write
+                self.setFunction(self.size-15+row, 8, write)
 
         # Horizontal
         for col in range(15):
             write = ((dataToWrite >> (14-col)) & 1) == 1
             if col < 6:
-                self.modules[8][col] = write
+                self.setFunction(8, col, write)
             elif col < 7: # Skip timing
-                self.modules[8][col+1] = write
+                self.setFunction(8, col+1, write)
             else: # Right Line
-                self.modules[8][self.size-15+col] = write
+                self.setFunction(8, self.size-15+col, write)
 
         
     #--------------------------------------------------
@@ -374,77 +749,33 @@ class Module:
         for row in range(6):
             for col in range(3):
                 write = ((dataToWrite >> ((row * 3) + col)) & 1) == 1
-                self.modules[row][self.size-11+col] = write
+                self.setFunction(row, self.size-11+col, write)
 
         # Bottom-Left (6x3)
         for col in range(6):
             for row in range(3):
                 write = ((dataToWrite >> ((col * 3) + row)) & 1) == 1
-                self.modules[self.size-11+row][col] = write
+                self.setFunction(self.size-11+row, col, write)
 
 
     #--------------------------------------------------
     # Datas
     #--------------------------------------------------
     def paintDatas(self, dataBuffer: BitBuffer, maskNumber: int):
-        totalDataBytes = len(dataBuffer.buffer)
-        bitIndex = 7
-        byteIndex = 0
-        row = self.size - 1
-        rowInc = -1 # Row increasement (up-down direction)
-
-        # Mask Function
-        maskFunc = getMaskPatternFunc(maskNumber)
-
-        # Loop from right to left
-        for baseColumn in range(self.size-1,0,-2):
-            # Skip timing line
-            if baseColumn <= 6: # Since using loop, use '<=' to change value for next loop & next next loop ...
-                baseColumn -= 1
-
-            # Range to draw
-            colRange = (baseColumn, baseColumn-1)
-
-            # Draw in these 2 columns until hit top-bottom or break
-            while True:
-                for col in colRange:
-                    # Blank slot
-                    if self.modules[row][col] is None:
-                        # Data to be written
-                        # If capacity is not filled, get White color.
-                        write = False
-
-                        # Still readable
-                        if byteIndex < totalDataBytes:
-                            # Get bit by byteIndex & bitIndex.
-                            # bitIndex is from right to left as 0~7 respectively.
-                            write = ((dataBuffer[byteIndex] >> bitIndex) & 1) == 1
-                            # Used 1 bit
-                            bitIndex -= 1
-
-                            if maskFunc(row, col):
-                                # Toggle
-                                write = not write
-
-                            # Write
-                            self.modules[row][col] = write
-
-                            # Next byte
-                            if bitIndex == -1:
-                                bitIndex = 7
-                                byteIndex += 1
-                        # Unreadable // If capacity is filled, nothing like this can be happened.
-                        else:
-                            break
+        # Every data bit from left to right as '0'/'1' characters.
+        data = dataBuffer.getBytes()
+        bits = format(int.from_bytes(data, "big"), "0{0}b".format(len(data) * 8))
 
-                # Next row
-                row += rowInc
+        # Scatter along the zigzag path.
+        # If capacity is not filled (zip() stops at shorter one), remaining modules are left white.
+        rows = self.modules.rows
+        for (row, col), bit in zip(getDataPath(self.version), bits):
+            if bit == "1":
+                rows[row] |= (1 << col)
 
-                # Hit top or bottom.
-                if row < 0 or row >= self.size:
-                    row -= rowInc # Go back 1 step.
-                    rowInc *= -1 # Swap direction.
-                    break
+        # Toggle whole data area by mask, one XOR per row.
+        if maskNumber is not None:
+            self.modules ^= getMaskPlanes(self.version)[maskNumber]
 
 
     #****************************************************************************************************
@@ -507,14 +838,117 @@ class Module:
     # Calculate Penalty Scores of Masking
     #--------------------------------------------------
     def calcPenaltyScore(self):
-        score = self.calcPenaltyScoreRule1()
-        score += self.calcPenaltyScoreRule2()
-        score += self.calcPenaltyScoreRule3()
-        score += self.calcPenaltyScoreRule4()
+        # Packed-int engine (NumPy backend is slower at every version).
+        rows, columns = self.packModules()
+
+        score = penaltyRule1(rows, self.size) + penaltyRule1(columns, self.size)
+        score += penaltyRule2(rows, self.size)
+        score += penaltyRule3(rows, self.size) + penaltyRule3(columns, self.size)
+        score += penaltyRule4(self.modules.countBits(), self.size)
 
         return score
 
 
+    #--------------------------------------------------
+    # Calculate Penalty Scores of all 8 Mask Patterns in one pass
+    #
+    # Only for unmasked Module (maskNumber is None).
+    # Each masked module is (this ^ mask plane ^ format bits),
+    # so all 8 are made by XOR with cached deltas & scored together.
+    #
+    # Parameters:
+    #   rules: Rule numbers to add into scores.
+    #--------------------------------------------------
+    def calcMaskPenaltyScores(self, rules: tuple = (1, 2, 3, 4)):
+        # NumPy backend is faster only without rules #1 & #3 (e.g. MaskPolicy.FAST) in larger versions.
+        if penalty.useNumpy and 1 not in rules and 3 not in rules and self.version >= NumpyMinVersion:
+            return numpyPenaltyScores(self.toArray() ^ getMaskDeltaArrays(self), rules)
+
+        rows, columns = getMaskDeltas(self)
+
+        area = self.size * self.size
+        rows ^= repeatPacked(packRows(self.modules.rows, self.size), area, 8)
+        # Only rules #1 & #3 look at columns.
+        if 1 in rules or 3 in rules:
+            columns ^= repeatPacked(packColumns(self.modules.rows, self.size), area, 8)
+        return penaltyScores(rows, columns, self.size, 8, rules)
+
+
+    #--------------------------------------------------
+    # Number of horizontal dark runs of all 8 Mask Patterns
+    #
+    # Only for unmasked Module (maskNumber is None).
+    #--------------------------------------------------
+    def calcMaskDarkRuns(self):
+        rows = getMaskDeltas(self)[0] ^ repeatPacked(packRows(self.modules.rows, self.size), self.size * self.size, 8)
+        return darkRuns(rows, self.size, 8)
+
+
+    #--------------------------------------------------
+    # Select Best Mask Pattern by Branch and Bound
+    #
+    # Only for unmasked Module (maskNumber is None).
+    # Rule #4 needs only number of dark modules, and rules #1 ~ #3 only add to the score.
+    # So start from rule #4 & cheap rule #2 (usually the biggest) of every pattern, lower first,
+    # add rule #1 then rule #3 (the most expensive),
+    # and give up a pattern as soon as its partial score can't beat the best complete one.
+    # Ties go to lower mask number, same as min() of (score, maskNumber).
+    #
+    # Return:
+    #   (score, maskNumber, number of skipped rule evaluations)
+    #--------------------------------------------------
+    def selectMask(self):
+        rowsDeltas, columnsDeltas = getMaskDeltas(self)
+        size = self.size
+
+        # Packed-int engine, NumPy backend is slower here at every version.
+        area = size * size
+        allBits = (1 << area) - 1
+        packedRows, packedColumns = self.packModules()
+        candidates = [(packedRows ^ ((rowsDeltas >> (i * area)) & allBits),
+                       packedColumns ^ ((columnsDeltas >> (i * area)) & allBits)) for i in range(8)]
+
+        # Rules #4 & #2 first (cheapest rules, no column is needed).
+        partialScores = [penaltyRule4(popcount(rows), size) + penaltyRule2(rows, size) for rows, columns in candidates]
+
+        best = None
+        skipped = 0
+        for i in sorted(range(8), key=lambda i: (partialScores[i], i)):
+            rows, columns = candidates[i]
+            score = partialScores[i]
+
+            # Can't beat the best one anymore, skip rules #1 & #3.
+            if best is not None and (score, i) > best:
+                skipped += 2
+                continue
+            score += penaltyRule1(rows, size) + penaltyRule1(columns, size)
+
+            # Same, skip rule #3.
+            if best is not None and (score, i) > best:
+                skipped += 1
+                continue
+            score += penaltyRule3(rows, size) + penaltyRule3(columns, size)
+
+            if best is None or (score, i) < best:
+                best = (score, i)
+
+        return (best[0], best[1], skipped)
+
+
+    #--------------------------------------------------
+    # Pack modules into one number each for rows & columns (see penalty.py)
+    #--------------------------------------------------
+    def packModules(self):
+        return (packRows(self.modules.rows, self.size), packColumns(self.modules.rows, self.size))
+
+
+    #--------------------------------------------------
+    # Modules as 2D bool array (NumPy backend)
+    #--------------------------------------------------
+    def toArray(self):
+        return toArray(self.modules.rows, self.size)
+
+
     #--------------------------------------------------
     # Condition #1
     #--------------------------------------------------
@@ -527,41 +961,8 @@ class Module:
         Add the horizontal and vertical total to obtain penalty score #1.
         """
 
-        score = 0
-        for row in range(self.size):
-            lastDot = self.modules[row][0]
-            sameCount = 1
-            for col in range(1, self.size):
-                # Same color
-                if self.modules[row][col] == lastDot:
-                    sameCount += 1
-                    if sameCount == 5:
-                        score += 3
-                    elif sameCount > 5:
-                        score += 1
-                # Not same color
-                else:
-                    lastDot = self.modules[row][col]
-                    sameCount = 1
-
-        # Vertical
-        for col in range(self.size):
-            lastDot = self.modules[0][col]
-            sameCount = 1
-            for row in range(1, self.size):
-                # Same color
-                if self.modules[row][col] == lastDot:
-                    sameCount += 1
-                    if sameCount == 5:
-                        score += 3
-                    elif sameCount > 5:
-                        score += 1
-                # Not same color
-                else:
-                    lastDot = self.modules[row][col]
-                    sameCount = 1
-
-        return score
+        rows, columns = self.packModules()
+        return penaltyRule1(rows, self.size) + penaltyRule1(columns, self.size)
 
 
     #--------------------------------------------------
@@ -580,50 +981,7 @@ class Module:
         For example, a 3x2 block of the same color should be counted as two 2x2 blocks, one overlapping the other. 
         """
 
-        score = 0
-        
-        # Optimized
-        moduleRange = range(self.size - 1)
-        for row in moduleRange:
-            # Use iterator and next() to skip next four-block.
-            # e.g.
-            #   A B C
-            #   D E F
-            # Look at left rectangle ABED,
-            # if Top-Right != Botton-Right (B != E), then both ABED and BCEF won't lost any point.
-            it = iter(moduleRange)
-            for col in it:
-                topRight = self.modules[row][col + 1]
-                if topRight != self.modules[row + 1][col + 1]:
-                    # Skip next one to reduce runtime.
-                    # None: Raise nothing if there is no next item.
-                    next(it, None)
-                elif topRight != self.modules[row][col]:
-                    continue
-                elif topRight != self.modules[row + 1][col]:
-                    continue
-                else:
-                    score += 3
-
-        #--------------------------------------------------
-        # Simple one
-        #for row in range(self.size-1):
-        #    for col in range(self.size-1):
-        #        count = 0
-        #        if self.modules[row][col]:
-        #            count += 1
-        #        if self.modules[row+1][col]:
-        #            count += 1
-        #        if self.modules[row][col+1]:
-        #            count += 1
-        #        if self.modules[row+1][col+1]:
-        #            count += 1
-        #        # 2x2 White or 2x2 Black
-        #        if count == 0 or count == 4:
-        #            score += 3
-        #--------------------------------------------------
-
-        return score
+        return penaltyRule2(packRows(self.modules.rows, self.size), self.size)
 
 
     #--------------------------------------------------
@@ -638,107 +996,9 @@ class Module:
         00001011101 (0x05D)
         Each time this pattern is found, add 40 to the penalty score.
         """
-        # ^
-        # Same patterns at index 1, 4, 5, 6, 9 which values are 0, 1, 0, 1, 0 respectively.
-
-        # Pattern1:     10111010000
-        # Pattern2: 00001011101
 
-        score = 0
-        # Horizontal
-        for row in range(self.size):
-            # Use iterator to skip those unmatched for sure.
-            it = iter(range(self.size - 10))
-            for col in it:
-                if (    not self.modules[row][col+1]
-                    and     self.modules[row][col+4]
-                    and not self.modules[row][col+5]
-                    and     self.modules[row][col+6]
-                    and not self.modules[row][col+9]
-                    and (
-                            (       self.modules[row][col]
-                            and     self.modules[row][col+2]
-                            and     self.modules[row][col+3]
-                            and not self.modules[row][col+7]
-                            and not self.modules[row][col+8]
-                            and not self.modules[row][col+10]
-                            )
-                        or
-                            (   not self.modules[row][col]
-                            and not self.modules[row][col+2]
-                            and not self.modules[row][col+3]
-                            and     self.modules[row][col+7]
-                            and     self.modules[row][col+8]
-                            and     self.modules[row][col+10]
-                            )
-                        )
-                    ):
-                    score += 40
-
-                # Boyer–Moore–Horspool algorithm.
-                # if this_row[col + 10] == True,  Pattern1 shift 4, Pattern2 shift 2. So min=2.
-                # if this_row[col + 10] == False, Pattern1 shift 1, Pattern2 shift 1. So min=1.
-                if self.modules[row][col+10]:
-                    next(it, None)
-
-        # Vertical
-        for col in range(self.size):
-            it = iter(range(self.size - 10))
-            for row in it:
-                if (    not self.modules[row+1][col]
-                    and     self.modules[row+4][col]
-                    and not self.modules[row+5][col]
-                    and     self.modules[row+6][col]
-                    and not self.modules[row+9][col]
-                    and (
-                            (       self.modules[row][col]
-                            and     self.modules[row+2][col]
-                            and     self.modules[row+3][col]
-                            and not self.modules[row+7][col]
-                            and not self.modules[row+8][col]
-                            and not self.modules[row+10][col]
-                            )
-                        or
-                            (   not self.modules[row][col]
-                            and not self.modules[row+2][col]
-                            and not self.modules[row+3][col]
-                            and     self.modules[row+7][col]
-                            and     self.modules[row+8][col]
-                            and     self.modules[row+10][col]
-                            )
-                        )
-                    ):
-                    score += 40
-
-                if self.modules[row+10][col]:
-                    next(it, None)
-
-        #--------------------------------------------------
-        # Slower, comment outed
-        ## Horizontal
-        #for row in range(self.size):
-        #    bits = 0
-        #    for col in range(self.size):
-        #        bits = ((bits << 1) & 0x7FF) # Keep 11 bits
-        #        bits |= 1 if self.modules[row][col] else 0
-
-        #        # Check from column 10~ & matched patterns.
-        #        if col >= 10 and (bits in (0x5D0, 0x05D)):
-        #            score += 40
-
-        ## Vertical
-        #for col in range(self.size):
-        #    bits = 0
-        #    for row in range(self.size):
-        #        bits = ((bits << 1) & 0x7FF) # Keep 11 bits
-        #        bits |= 1 if self.modules[row][col] else 0
-
-        #        # Check from row 10~ & matched patterns.
-        #        if row >= 10 and (bits in (0x5D0, 0x05D)):
-        #            score += 40
-        #--------------------------------------------------
-
-        return score
+        rows, columns = self.packModules()
+        return penaltyRule3(rows, self.size) + penaltyRule3(columns, self.size)
 
 
     #--------------------------------------------------
@@ -759,20 +1019,138 @@ class Module:
            the lower number is 1, so the result is 10. This is penalty score #4.
         """
 
-        # Step 2
-        darkCount = 0
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.modules[row][col]:
-                    darkCount += 1
+        return penaltyRule4(self.modules.countBits(), self.size)
 
-        # Step 1, 3
-        percent = (darkCount / (self.size * self.size)) * 100.0
-        # Step 4-7
-        # Find smaller number from 2 numbers -> use // to throw away remainder.
-        score = (abs(percent - 50) // 5) * 10
 
-        return score
+####################################################################################################
+# Function Pattern Template Cache
+####################################################################################################
+# version -> Module with function patterns only.
+_templateCache = {}
+
+def getFunctionTemplate(version: int):
+    template = _templateCache.get(version)
+    if template is None:
+        template = Module(None, None, version)
+        _templateCache[version] = template
+    return template
+
+
+####################################################################################################
+# Data Placement Path Cache
+####################################################################################################
+# version -> list of (row, col).
+_dataPathCache = {}
+
+def getDataPath(version: int):
+    path = _dataPathCache.get(version)
+    if path is not None:
+        return path
+
+    functions = getFunctionTemplate(version).functions
+    size = functions.size
+    path = []
+    upward = True # First column pair goes from bottom to top.
+
+    # Loop from right to left
+    for baseColumn in range(size-1,0,-2):
+        # Skip timing line
+        if baseColumn <= 6: # Since using loop, use '<=' to change value for next loop & next next loop ...
+            baseColumn -= 1
+
+        # Walk these 2 columns until hit top or bottom.
+        if upward:
+            rowRange = range(size-1, -1, -1)
+        else:
+            rowRange = range(size)
+
+        for row in rowRange:
+            for col in (baseColumn, baseColumn-1):
+                # Blank slot
+                if not functions.get(row, col):
+                    path.append((row, col))
+
+        # Swap direction.
+        upward = not upward
+
+    _dataPathCache[version] = path
+    return path
+
+
+####################################################################################################
+# Mask Plane Cache
+####################################################################################################
+# version -> list of 8 BitMatrix.
+_maskPlaneCache = {}
+
+def getMaskPlanes(version: int):
+    planes = _maskPlaneCache.get(version)
+    if planes is not None:
+        return planes
+
+    functions = getFunctionTemplate(version).functions
+    size = functions.size
+    allBits = (1 << size) - 1
+    planes = []
+
+    for maskNumber in range(8):
+        maskFunc = getMaskPatternFunc(maskNumber)
+
+        # Every mask pattern repeats each 12 rows & 6 columns,
+        # so only 12 rows are needed to be calculated.
+        periodRows = []
+        for row in range(12):
+            bits = "".join(["1" if maskFunc(row, col) else "0" for col in range(6)])
+            # Repeat to full width. Column 0 is at least significant bit.
+            periodRows.append(int((bits * (size // 6 + 1))[:size][::-1], 2))
+
+        # Keep data area only.
+        rows = [periodRows[row % 12] & ~functions.rows[row] & allBits for row in range(size)]
+        planes.append(BitMatrix(size, rows))
+
+    _maskPlaneCache[version] = planes
+    return planes
+
+
+####################################################################################################
+# Mask Delta Cache
+####################################################################################################
+# (version, errorCorrection) -> (packed rows, packed columns)
+_maskDeltaCache = {}
+
+def getMaskDeltas(base):
+    key = (base.version, base.errorCorrection)
+    deltas = _maskDeltaCache.get(key)
+    if deltas is not None:
+        return deltas
+
+    # Format area of unmasked module is blank & mask planes never touch function modules,
+    # so (masked ^ unmasked) is same for every data.
+    size = base.size
+    area = size * size
+    matrices = [base.makeMasked(i).modules ^ base.modules for i in range(8)]
+
+    rows = 0
+    columns = 0
+    for k, matrix in enumerate(matrices):
+        rows |= packRows(matrix.rows, size) << (k * area)
+        columns |= packColumns(matrix.rows, size) << (k * area)
+
+    deltas = (rows, columns)
+    _maskDeltaCache[key] = deltas
+    return deltas
+
+
+# (version, errorCorrection) -> NumPy array
+_maskDeltaArrayCache = {}
+
+def getMaskDeltaArrays(base):
+    key = (base.version, base.errorCorrection)
+    arrays = _maskDeltaArrayCache.get(key)
+    if arrays is None:
+        arrays = penalty.numpy.stack([toArray((base.makeMasked(i).modules ^ base.modules).rows, base.size) for i in range(8)])
+        _maskDeltaArrayCache[key] = arrays
+    return arrays
 
 
 ####################################################################################################
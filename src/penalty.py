@@ -0,0 +1,342 @@
+from src.BitMatrix import popcount
+
+# Optional: NumPy backend
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+"""
+Penalty Score Engine
+
+Work on whole matrix packed into one (big) number, "size" bits per line.
+Bit "c" of line "r" is at bit (r * size + c).
+Each rule is done by few shift, XOR, AND and popcount operations on the whole number,
+so there is no per-module Python loop.
+Rules 1 and 3 look along lines, so call them with both packed rows and packed columns.
+
+
+### packRows() function ###
+Pack rows of BitMatrix into one number.
+
+Parameters
+- rows: list
+    List of "size"-bit numbers, column 0 at least significant bit.
+- size: int
+    Width and height of matrix.
+
+
+### packColumns() function ###
+Pack columns of BitMatrix into one number (Same as packRows() of transposed matrix).
+
+Parameters
+- rows: list
+    List of "size"-bit numbers, column 0 at least significant bit.
+- size: int
+    Width and height of matrix.
+
+
+### getLineMask() function ###
+Get number which has lowest "width" bits of first "lines" lines set, in each of "count" packed matrices.
+Built once per arguments.
+
+
+### repeatPacked() function ###
+Put "count" copies of one packed matrix side by side (matrix k at bit k * size * size).
+
+
+### splitCount() function ###
+Count 1 bits of each of "count" packed matrices.
+
+
+### penaltyRule1() function ###
+Penalty score rule #1 along lines of "packed".
+
+
+### penaltyRule2() function ###
+Penalty score rule #2 of "packed" rows.
+
+
+### penaltyRule3() function ###
+Penalty score rule #3 along lines of "packed".
+
+
+### penaltyRule4() function ###
+Penalty score rule #4 from number of dark modules.
+
+
+### penaltyScores() function ###
+Total penalty scores of "count" matrices at once.
+Shifts & ANDs of rules 1 ~ 3 are done once for all matrices, then 1 bits are counted per matrix.
+
+Parameters
+- rows: int
+    Packed rows of every matrix side by side (see repeatPacked()).
+- columns: int
+    Packed columns of every matrix side by side.
+- size: int
+    Width and height of matrix.
+- count: int
+    Number of matrices.
+- rules: tuple
+    Rule numbers to add into scores.
+
+
+### darkRuns() function ###
+Number of horizontal runs of dark modules of "count" packed matrices,
+i.e. number of rectangles to draw by vector renderer.
+
+
+### NumPy backend ###
+Used automatically when NumPy can be imported, set "useNumpy" to False to use pure Python engine above.
+Matrix is 2D bool array, rows & columns are handled by the same code through transposed view.
+
+- toArray(list rows, int size) -> numpy.ndarray
+    Unpack rows of BitMatrix into "size" x "size" bool array.
+- numpyRule1(numpy.ndarray array) -> int
+- numpyRule2(numpy.ndarray array) -> int
+- numpyRule3(numpy.ndarray array) -> int
+- numpyRule4(numpy.ndarray array) -> int
+    Same as penaltyRule1() ~ penaltyRule4(), for both rows & columns.
+- numpyPenaltyScores(numpy.ndarray arrays, tuple rules) -> list
+    Same as penaltyScores(), for "count" x "size" x "size" bool array.
+"""
+
+
+# Use NumPy backend or not.
+useNumpy = numpy is not None
+
+
+####################################################################################################
+# Pack matrix into one number
+####################################################################################################
+def packRows(rows: list, size: int):
+    packed = 0
+    for row in reversed(rows):
+        packed = (packed << size) | row
+    return packed
+
+def packColumns(rows: list, size: int):
+    # Bit strings with column 0 at first character.
+    strings = [format(row, "0{0}b".format(size))[::-1] for row in rows]
+    # Read column by column, then reverse so last column's last row becomes most significant bit.
+    return int("".join(["".join(bits) for bits in zip(*strings)])[::-1], 2)
+
+
+####################################################################################################
+# Line Mask Cache
+####################################################################################################
+# (size, width, lines, count) -> number
+_lineMaskCache = {}
+
+def getLineMask(size: int, width: int, lines: int, count: int = 1):
+    key = (size, width, lines, count)
+    mask = _lineMaskCache.get(key)
+    if mask is None:
+        line = (1 << width) - 1
+        mask = 0
+        for i in range(lines):
+            mask |= line << (i * size)
+        mask = repeatPacked(mask, size * size, count)
+        _lineMaskCache[key] = mask
+    return mask
+
+
+####################################################################################################
+# Many packed matrices side by side
+####################################################################################################
+def repeatPacked(packed: int, area: int, count: int):
+    # Multiply by 1 bit at start of every matrix (no carry, since each copy fits in "area" bits).
+    return packed * sum([1 << (k * area) for k in range(count)])
+
+def splitCount(bits: int, area: int, count: int):
+    allBits = (1 << area) - 1
+    return [popcount((bits >> (k * area)) & allBits) for k in range(count)]
+
+
+####################################################################################################
+# Rule #1: 5 or more same color modules in line
+####################################################################################################
+def _rule1Bits(packed: int, size: int, count: int):
+    # Bit c is 1 where module c and c+1 are same color (last module of each line has no next one).
+    same = ~(packed ^ (packed >> 1)) & getLineMask(size, size - 1, size, count)
+    # Bit c is 1 where module c ~ c+4 are same color.
+    # Since last bit of each line of "same" is 0, it never crosses to next line.
+    five = same & (same >> 1) & (same >> 2) & (same >> 3)
+    # A run of L (>= 5) modules has (L - 4) 1s in "five" and scores 3 + (L - 5) = (L - 4) + 2.
+    # So count 1s, then add 2 for each run (first 1 of each group of 1s).
+    return (five, five & ~(five << 1))
+
+def penaltyRule1(packed: int, size: int):
+    five, runs = _rule1Bits(packed, size, 1)
+    return popcount(five) + 2 * popcount(runs)
+
+
+####################################################################################################
+# Rule #2: 2x2 same color blocks
+####################################################################################################
+def _rule2Bits(packed: int, size: int, count: int):
+    # Bit c of line r is 1 where (r, c) and (r+1, c) are same color.
+    vertical = ~(packed ^ (packed >> size))
+    # Bit c of line r is 1 where (r, c) and (r, c+1) are same color.
+    horizontal = ~(packed ^ (packed >> 1))
+    # Top-left of every 2x2 block (last line has no next line).
+    return vertical & (vertical >> 1) & horizontal & getLineMask(size, size - 1, size - 1, count)
+
+def penaltyRule2(packed: int, size: int):
+    return popcount(_rule2Bits(packed, size, 1)) * 3
+
+
+####################################################################################################
+# Rule #3: 1:1:3:1:1 pattern with 4 light modules on either side
+####################################################################################################
+# 10111010000 (0x5D0) and 00001011101 (0x05D), first character is first module of line.
+FinderLikePatterns = ("10111010000", "00001011101")
+
+def _rule3Bits(packed: int, size: int, count: int):
+    # Every position where whole 11 modules fit in line.
+    starts = getLineMask(size, size - 10, size, count)
+    inverted = ~packed
+
+    # 2 patterns never match at same position, so OR them together.
+    allFound = 0
+    for pattern in FinderLikePatterns:
+        found = starts
+        for i, bit in enumerate(pattern):
+            found &= (packed if bit == "1" else inverted) >> i
+        allFound |= found
+
+    return allFound
+
+def penaltyRule3(packed: int, size: int):
+    return popcount(_rule3Bits(packed, size, 1)) * 40
+
+
+####################################################################################################
+# Rule #4: Dark module ratio
+####################################################################################################
+def penaltyRule4(darkCount: int, size: int):
+    percent = (darkCount / (size * size)) * 100.0
+    # Find smaller number from 2 numbers -> use // to throw away remainder.
+    return (abs(percent - 50) // 5) * 10
+
+
+####################################################################################################
+# All rules of many matrices at once
+####################################################################################################
+def penaltyScores(rows: int, columns: int, size: int, count: int, rules: tuple = (1, 2, 3, 4)):
+    area = size * size
+    scores = [0] * count
+
+    # (bits, points per 1 bit)
+    found = []
+    if 1 in rules:
+        found += zip(_rule1Bits(rows, size, count), (1, 2))
+        found += zip(_rule1Bits(columns, size, count), (1, 2))
+    if 2 in rules:
+        found.append((_rule2Bits(rows, size, count), 3))
+    if 3 in rules:
+        found.append((_rule3Bits(rows, size, count), 40))
+        found.append((_rule3Bits(columns, size, count), 40))
+
+    for oneBits, point in found:
+        for k, cnt in enumerate(splitCount(oneBits, area, count)):
+            scores[k] += cnt * point
+
+    if 4 in rules:
+        for k, darkCount in enumerate(splitCount(rows, area, count)):
+            scores[k] += penaltyRule4(darkCount, size)
+
+    return scores
+
+
+####################################################################################################
+# Number of horizontal dark runs (rectangles to draw)
+####################################################################################################
+def darkRuns(rows: int, size: int, count: int):
+    # First dark module of each run: dark & left one is light (or it is at first column).
+    starts = rows & ~((rows << 1) & ~getLineMask(size, 1, size, count))
+    return splitCount(starts, size * size, count)
+
+
+####################################################################################################
+# NumPy backend
+####################################################################################################
+def toArray(rows: list, size: int):
+    byteCount = (size + 7) // 8
+    raw = b"".join([row.to_bytes(byteCount, "little") for row in rows])
+    bits = numpy.unpackbits(numpy.frombuffer(raw, dtype=numpy.uint8), bitorder="little")
+    return bits.reshape(size, byteCount * 8)[:, :size].astype(bool)
+
+
+# Every function below also accepts stacked "count" x "size" x "size" array,
+# then returns count of each matrix as array.
+def _countEach(array):
+    return numpy.count_nonzero(array, axis=(-2, -1))
+
+
+#--------------------------------------------------
+# Rule #1 along each line of array
+#--------------------------------------------------
+def _numpyRule1Lines(array):
+    same = array[..., 1:] == array[..., :-1]
+    five = same[..., :-3] & same[..., 1:-2] & same[..., 2:-1] & same[..., 3:]
+    # First 1 of each group of 1s.
+    runs = _countEach(five[..., :1]) + _countEach(five[..., 1:] & ~five[..., :-1])
+    return _countEach(five) + 2 * runs
+
+def numpyRule1(array):
+    return _numpyRule1Lines(array) + _numpyRule1Lines(numpy.swapaxes(array, -2, -1))
+
+
+#--------------------------------------------------
+# Rule #2
+#--------------------------------------------------
+def numpyRule2(array):
+    topLeft = array[..., :-1, :-1]
+    blocks = (topLeft == array[..., :-1, 1:]) & (topLeft == array[..., 1:, :-1]) & (topLeft == array[..., 1:, 1:])
+    return _countEach(blocks) * 3
+
+
+#--------------------------------------------------
+# Rule #3 along each line of array
+#--------------------------------------------------
+def _numpyRule3Lines(array):
+    width = array.shape[-1] - 10
+    count = 0
+    for pattern in FinderLikePatterns:
+        found = numpy.ones(array.shape[:-1] + (width,), dtype=bool)
+        for i, bit in enumerate(pattern):
+            if bit == "1":
+                found &= array[..., i:i+width]
+            else:
+                found &= ~array[..., i:i+width]
+        count = count + _countEach(found)
+    return count * 40
+
+def numpyRule3(array):
+    return _numpyRule3Lines(array) + _numpyRule3Lines(numpy.swapaxes(array, -2, -1))
+
+
+#--------------------------------------------------
+# Rule #4
+#--------------------------------------------------
+def numpyRule4(array):
+    return penaltyRule4(int(_countEach(array)), array.shape[-1])
+
+
+#--------------------------------------------------
+# All rules of stacked array
+#--------------------------------------------------
+def numpyPenaltyScores(arrays, rules: tuple = (1, 2, 3, 4)):
+    scores = numpy.zeros(arrays.shape[0], dtype=int)
+    for rule, function in ((1, numpyRule1), (2, numpyRule2), (3, numpyRule3)):
+        if rule in rules:
+            scores = scores + function(arrays)
+
+    if 4 not in rules:
+        return [int(score) for score in scores]
+
+    size = arrays.shape[-1]
+    return [int(score) + penaltyRule4(int(darkCount), size) for score, darkCount in zip(scores, _countEach(arrays))]
@@ -14,6 +14,25 @@ Members
 Get every number of data codewords and error correction codewords from
 Reed-Solomon block corresponding to error correction level.
 
+Parameters
+- version: int
+    Version of QR Code.
+- errorCorrection: constants.ErrorCorrection
+    Error Correction Level of QR Code.
+
+
+### DataBitsTable ###
+Number of data bits (all data codewords * 8) of each version & error correction level.
+Index is same as RS_BLOCK_TABLE, (version - 1) * 4 + error correction level.
+
+### DataBitsByLevel ###
+Same as DataBitsTable, list of 40 versions for each error correction level.
+DataBitsByLevel[level][version - 1]
+
+
+### getDataBits() function ###
+Get number of data bits from DataBitsTable.
+
 Parameters
 - version: int
     Version of QR Code.
@@ -45,4 +64,15 @@ def blockInfo(version: int, errorCorrection: ErrorCorrection):
         for j in range(noOfBlocks):
             blocks.append(RSBlock(dataCodeword, ecCodeword))
 
-    return blocks
\ No newline at end of file
+    return blocks
+
+
+####################################################################################################
+# Data Capacity (bits)
+####################################################################################################
+DataBitsTable = [sum([info[i] * info[i+1] for i in range(1, len(info), 2)]) * 8 for info in RS_BLOCK_TABLE]
+
+DataBitsByLevel = [DataBitsTable[level::4] for level in range(4)]
+
+def getDataBits(version: int, errorCorrection: ErrorCorrection):
+    return DataBitsTable[(version - 1) * 4 + int(errorCorrection)]
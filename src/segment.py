@@ -0,0 +1,463 @@
+from src.BitBuffer import BitBuffer
+from src.constants import *
+
+"""
+Segmentation
+
+Data can be split into segments of different modes (numeric, alphanumeric, byte, kanji).
+Each segment has its own mode indicator and character count indicator,
+so e.g. digits in a URL can be encoded in numeric mode while the rest is in byte mode.
+
+
+### Segment class ###
+Members
+- mode: constants.ModeIndicator
+    Mode of this segment.
+- data: str or bytes
+    Characters to encode. Bytes (UTF-8 for str data) in byte mode.
+    In kanji mode, str or Shift-JIS bytes (2 bytes per character).
+- count: int
+    Number of characters (bytes in byte mode), written in character count indicator.
+
+Methods
+- getBitLength(int version) -> int
+    Number of bits of this segment, including mode indicator & character count indicator.
+
+
+### getCountBits() function ###
+Number of bits of character count indicator.
+
+Parameters
+- mode: constants.ModeIndicator
+- version: int
+
+
+### getSegmentsBitLength() function ###
+Total number of bits of "segments" in "version".
+
+
+### makeSegments() function ###
+Split string into segments with fewest bits, by dynamic programming over characters.
+Since character count indicator size depends on version, result is for that version's group (1-9, 10-26, 27-40).
+Numeric string is always 1 segment (no dynamic programming),
+and so is string which can only be byte mode (no character is numeric, alphanumeric or kanji).
+
+Parameters
+- dataString: str
+    String data to encode.
+- version: int
+    Version to encode.
+- charCosts: list
+    Result of getCharCosts(dataString). If None is given, it is calculated.
+    Give it to call for each version group without calculating again.
+
+Return
+- list
+    List of Segment.
+
+
+### getCharCosts() function ###
+Cost of every character in each mode, as list of tuple (numeric, alphanumeric, byte, kanji) in 1/6 bits.
+Same for all versions. Kanji table is looked up only for non-ASCII characters.
+
+
+### Character Class ###
+Numeric & alphanumeric characters are found by look up tables of Latin-1 code (256 bytes each),
+used by bytes.translate() to convert whole string at once.
+
+- CharClassNumeric, CharClassAlphaNum, CharClassOther: int
+    Class of character. Each class is subset of next one.
+- CharClassTable: bytes
+    Latin-1 code -> class of character.
+- AlphaNumValueTable: bytes
+    Latin-1 code -> value in alphanumeric mode (also digit value of "0" ~ "9").
+- getStringClass(str dataString) -> int
+    Class of whole string (highest class of all characters), in 1 pass.
+
+
+### makeSingleSegment() function ###
+Whole string in 1 segment, mode is chosen by checking all characters (numeric, alphanumeric, kanji, then byte).
+Bytes-like data is byte mode,
+or kanji mode if "shiftJis" is True and all byte pairs are kanji (see areAllBytesKanji()).
+
+
+### putSegments() function ###
+Put mode indicator, character count indicator & encoded data of every segment into buffer.
+
+Parameters
+- buffer: BitBuffer
+- segments: list
+    List of Segment.
+- version: int
+
+
+### getKanjiTable() function ###
+Get dict of code point -> 13-bit kanji mode value, for every multibyte Kanji on Rikai's Shift JIS Kanji Code Table.
+Built on first use, by decoding every Shift-JIS code in ranges 0x8140 to 0x9FFC and 0xE040 to 0xEBBF.
+
+
+### areAllCharKanji() function ###
+Check all characters are Kanji or not.
+
+Return "True" if all characters are multibyte Kanji on Rikai's Shift JIS Kanji Code Table.
+Return "False" if any character is NOT Kanji found.
+
+Parameters
+- dataString: str
+    String data to encode.
+
+
+### areAllBytesKanji() function ###
+Same as areAllCharKanji(), for Shift-JIS bytes (every 2 bytes is 1 character).
+"""
+
+
+####################################################################################################
+# Segment
+####################################################################################################
+class Segment:
+    def __init__(self, mode: ModeIndicator, data):
+        self.mode = mode
+        self.data = data
+        if mode == ModeIndicator.KANJI and not isinstance(data, str):
+            # Shift-JIS bytes
+            self.count = len(data) // 2
+        else:
+            self.count = len(data)
+
+    #--------------------------------------------------
+    # Number of bits
+    #--------------------------------------------------
+    def getBitLength(self, version: int):
+        count = self.count
+        if self.mode == ModeIndicator.NUMERIC:
+            dataBits = (count // 3) * 10 + (0, 4, 7)[count % 3]
+        elif self.mode == ModeIndicator.ALPHANUM:
+            dataBits = (count // 2) * 11 + (count % 2) * 6
+        elif self.mode == ModeIndicator.BYTE:
+            dataBits = count * 8
+        else:
+            dataBits = count * 13
+
+        return 4 + getCountBits(self.mode, version) + dataBits
+
+
+####################################################################################################
+# Character Count Indicator size
+####################################################################################################
+def getCountBits(mode: ModeIndicator, version: int):
+    if version <= 9:
+        return EncodeSize_S[int(mode)]
+    elif version <= 26:
+        return EncodeSize_M[int(mode)]
+    else:
+        return EncodeSize_L[int(mode)]
+
+
+def getSegmentsBitLength(segments: list, version: int):
+    return sum([segment.getBitLength(version) for segment in segments])
+
+
+####################################################################################################
+# Optimal Segmentation
+####################################################################################################
+# Modes in order of ModeIndicator value.
+Modes = [ModeIndicator.NUMERIC, ModeIndicator.ALPHANUM, ModeIndicator.BYTE, ModeIndicator.KANJI]
+
+# Cost of character which can't be encoded in that mode (larger than any real cost).
+ImpossibleCost = 1 << 62
+
+#--------------------------------------------------
+# Cost of every character in each mode, in 1/6 bits (ImpossibleCost if it can't be encoded in that mode).
+#   Numeric: 10 bits per 3 characters, Alphanumeric: 11 bits per 2 characters,
+#   Byte: 8 bits per UTF-8 byte, Kanji: 13 bits.
+# Same for all versions, so calculate once and give it to makeSegments() of each version group.
+#--------------------------------------------------
+def getCharCosts(dataString: str):
+    # Each distinct character only once.
+    costsOfChar = {}
+    for char in set(dataString):
+        code = ord(char)
+        charClass = CharClassTable[code] if code < 256 else CharClassOther
+        costsOfChar[char] = (
+            20 if charClass == CharClassNumeric else ImpossibleCost,
+            33 if charClass != CharClassOther else ImpossibleCost,
+            len(char.encode("utf-8")) * 48,
+            # ASCII is never Kanji, so Kanji table isn't built for ASCII only string.
+            78 if code >= 128 and code in getKanjiTable() else ImpossibleCost,
+        )
+    return [costsOfChar[char] for char in dataString]
+
+def makeSegments(dataString: str, version: int, charCosts: list = None):
+    # Numeric string: 1 segment is optimal.
+    if getStringClass(dataString) == CharClassNumeric:
+        return _splitByCount(ModeIndicator.NUMERIC, dataString, version)
+
+    if charCosts is None:
+        charCosts = getCharCosts(dataString)
+
+    # Byte mode only: 1 segment is optimal.
+    if all([costs[0] == costs[1] == costs[3] == ImpossibleCost for costs in set(charCosts)]):
+        return _splitByCount(ModeIndicator.BYTE, dataString.encode("utf-8"), version)
+
+    # Mode indicator & character count indicator of new segment.
+    header0, header1, header2, header3 = [(4 + getCountBits(mode, version)) * 6 for mode in Modes]
+
+    # cost0 ~ cost3: fewest bits so far, where next character goes to mode 0 ~ 3 segment (its header is paid).
+    cost0, cost1, cost2, cost3 = header0, header1, header2, header3
+    # For each character, mode of that character for each mode of next character.
+    charModes = []
+
+    for charCost0, charCost1, charCost2, charCost3 in charCosts:
+        # Continue segment of same mode.
+        cost0 += charCost0
+        cost1 += charCost1
+        cost2 += charCost2
+        cost3 += charCost3
+
+        # Or start new segment after this character (previous segment is rounded up to whole bits).
+        # Cheapest one is first mode whose rounded cost is same as rounded fewest cost.
+        rounded = -(-min(cost0, cost1, cost2, cost3) // 6) * 6
+        low = rounded - 6
+        fromMode = 0 if low < cost0 <= rounded else 1 if low < cost1 <= rounded else 2 if low < cost2 <= rounded else 3
+
+        choice0 = 0
+        if rounded + header0 < cost0:
+            cost0 = rounded + header0
+            choice0 = fromMode
+        choice1 = 1
+        if rounded + header1 < cost1:
+            cost1 = rounded + header1
+            choice1 = fromMode
+        choice2 = 2
+        if rounded + header2 < cost2:
+            cost2 = rounded + header2
+            choice2 = fromMode
+        choice3 = 3
+        if rounded + header3 < cost3:
+            cost3 = rounded + header3
+            choice3 = fromMode
+
+        charModes.append((choice0, choice1, choice2, choice3))
+
+    # Trace back from cheapest end.
+    costs = [cost0, cost1, cost2, cost3]
+    m = costs.index(min(costs))
+    modeOfChars = [0] * len(dataString)
+    for i in range(len(dataString) - 1, -1, -1):
+        m = charModes[i][m]
+        modeOfChars[i] = m
+
+    #------------------------------
+    # Group characters into segments
+    #------------------------------
+    segments = []
+    start = 0
+    for i in range(1, len(dataString) + 1):
+        if i == len(dataString) or modeOfChars[i] != modeOfChars[start]:
+            mode = Modes[modeOfChars[start]]
+            text = dataString[start:i]
+            segments += _splitByCount(mode, text.encode("utf-8") if mode == ModeIndicator.BYTE else text, version)
+            start = i
+
+    return segments
+
+
+#--------------------------------------------------
+# Split data which is too long for character count indicator.
+#--------------------------------------------------
+def _splitByCount(mode: ModeIndicator, data, version: int):
+    maxCount = (1 << getCountBits(mode, version)) - 1
+    return [Segment(mode, data[i:i+maxCount]) for i in range(0, len(data), maxCount)]
+
+
+####################################################################################################
+# Character Class
+####################################################################################################
+CharClassNumeric, CharClassAlphaNum, CharClassOther = range(3)
+
+# Latin-1 code -> character class
+CharClassTable = bytes([
+    CharClassNumeric if chr(code) in "0123456789" else
+    CharClassAlphaNum if chr(code) in AlphaNum else
+    CharClassOther
+    for code in range(256)])
+
+# Latin-1 code -> value in alphanumeric mode (same as digit value for "0" ~ "9")
+AlphaNumValueTable = bytes([AlphaNum.index(chr(code)) if chr(code) in AlphaNum else 0 for code in range(256)])
+
+def getStringClass(dataString: str):
+    # Not Latin-1, can't be numeric or alphanumeric.
+    try:
+        codes = dataString.encode("latin-1")
+    except UnicodeEncodeError:
+        return CharClassOther
+
+    # Class of every character in 1 pass, then highest one is class of whole string.
+    return max(codes.translate(CharClassTable), default=CharClassNumeric)
+
+
+####################################################################################################
+# Single Segment
+####################################################################################################
+def makeSingleSegment(dataString, shiftJis: bool = False):
+    # Bytes-like data: byte mode as is.
+    if isinstance(dataString, (bytes, bytearray, memoryview)):
+        payload = dataString
+        # Flat bytes view, so that len() is number of bytes.
+        if isinstance(payload, memoryview) and (payload.ndim != 1 or payload.format != "B"):
+            payload = payload.cast("B") if payload.c_contiguous else memoryview(payload.tobytes())
+        if shiftJis and areAllBytesKanji(payload):
+            return [Segment(ModeIndicator.KANJI, payload)]
+        return [Segment(ModeIndicator.BYTE, payload)]
+
+    # * NOT use isdigit() or isnumeric() or isdecimal() for checking Numeric.
+    #   reason is written in README.md
+    charClass = getStringClass(dataString)
+    if charClass == CharClassNumeric:
+        return [Segment(ModeIndicator.NUMERIC, dataString)]
+    elif charClass == CharClassAlphaNum:
+        return [Segment(ModeIndicator.ALPHANUM, dataString)]
+    elif areAllCharKanji(dataString):
+        return [Segment(ModeIndicator.KANJI, dataString)]
+    else:
+        # Convert string to UTF-8 (make sure that this data can be encoded for QR).
+        return [Segment(ModeIndicator.BYTE, dataString.encode("utf-8"))]
+
+
+####################################################################################################
+# Encode Segments
+####################################################################################################
+def putSegments(buffer: BitBuffer, segments: list, version: int):
+    for segment in segments:
+        # Mode Indicator
+        buffer.put((1 << int(segment.mode)), 4)
+        # Character Count Indicator
+        buffer.put(segment.count, getCountBits(segment.mode, version))
+
+        # Data
+        if segment.mode == ModeIndicator.NUMERIC:
+            _putNumeric(buffer, segment.data)
+        elif segment.mode == ModeIndicator.ALPHANUM:
+            _putAlphaNum(buffer, segment.data)
+        elif segment.mode == ModeIndicator.BYTE:
+            # Put all bytes at once.
+            buffer.putBytes(segment.data)
+        else:
+            _putKanji(buffer, segment.data)
+
+
+#--------------------------------------------------
+# Numeric
+#--------------------------------------------------
+def _putNumeric(buffer: BitBuffer, dataString: str):
+    # Value of each digit, then every 3 digits as 1 number.
+    values = dataString.encode("ascii").translate(AlphaNumValueTable)
+    full = len(values) - len(values) % 3
+    buffer.putList([a * 100 + b * 10 + c for a, b, c in zip(values[0:full:3], values[1:full:3], values[2:full:3])], 10)
+
+    # Last 1 or 2 digits
+    rest = values[full:]
+    if len(rest) > 0:
+        buffer.put(int(dataString[full:]), NumericLength[len(rest)])
+
+
+#--------------------------------------------------
+# Alphanumeric
+#--------------------------------------------------
+def _putAlphaNum(buffer: BitBuffer, dataString: str):
+    # Value of each character, then every 2 characters as 1 number.
+    values = dataString.encode("ascii").translate(AlphaNumValueTable)
+    full = len(values) - len(values) % 2
+    buffer.putList([a * 45 + b for a, b in zip(values[0:full:2], values[1:full:2])], 11)
+
+    # Last 1 character
+    if full < len(values):
+        buffer.put(values[-1], 6)
+
+
+#--------------------------------------------------
+# Kanji
+#--------------------------------------------------
+def _putKanji(buffer: BitBuffer, data):
+    # String: look up each character.
+    if isinstance(data, str):
+        table = getKanjiTable()
+        buffer.putList([table[ord(char)] for char in data], 13)
+        return
+
+    # Shift-JIS bytes: read byte pairs.
+    nums = []
+    for i in range(0, len(data) - 1, 2):
+        code = (data[i] << 8) | data[i + 1]
+        nums.append(_kanjiValue(code))
+    buffer.putList(nums, 13)
+
+
+#--------------------------------------------------
+# Shift-JIS code -> 13-bit value
+#--------------------------------------------------
+def _kanjiValue(code: int):
+    # In ranges 0x8140 to 0x9FFC
+    if code <= 0x9FFC:
+        code -= 0x8140
+    # In ranges 0xE040 to 0xEBBF
+    else:
+        code -= 0xC140
+
+    # (Most significant byte * 0xC0) + Least significant byte
+    return ((code >> 8) * 0xC0) + (code & 0xFF)
+
+
+####################################################################################################
+# Kanji Table
+####################################################################################################
+# Code point -> 13-bit value
+_kanjiTable = None
+
+def getKanjiTable():
+    global _kanjiTable
+    if _kanjiTable is None:
+        table = {}
+        for first, last in ((0x8140, 0x9FFC), (0xE040, 0xEBBF)):
+            for code in range(first, last + 1):
+                pair = code.to_bytes(2, "big")
+                try:
+                    char = pair.decode("shift-jis")
+                except UnicodeDecodeError:
+                    continue
+                # Only the code which the character is encoded to.
+                if len(char) == 1 and char.encode("shift-jis") == pair:
+                    table[ord(char)] = _kanjiValue(code)
+        _kanjiTable = table
+    return _kanjiTable
+
+
+####################################################################################################
+# Check all string are Kanji character or not
+#
+# Return "True" if all characters are multibyte Kanji on Rikai's Shift JIS Kanji Code Table
+# Return "False" if contain Non-Kanji at least 1 character
+####################################################################################################
+def areAllCharKanji(dataString: str):
+    table = getKanjiTable()
+    for char in dataString:
+        if ord(char) not in table:
+            return False
+
+    # All are Kanji
+    return True
+
+
+def areAllBytesKanji(data):
+    if len(data) % 2 != 0:
+        return False
+
+    for i in range(0, len(data), 2):
+        code = (data[i] << 8) | data[i + 1]
+        # In ranges 0x8140 to 0x9FFC and 0xE040 to 0xEBBF, 2nd byte is 0x40 to 0xFC except 0x7F
+        if not ((0x8140 <= code <= 0x9FFC or 0xE040 <= code <= 0xEBBF) and 0x40 <= data[i + 1] <= 0xFC and data[i + 1] != 0x7F):
+            return False
+
+    # All are Kanji
+    return True
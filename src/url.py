@@ -0,0 +1,56 @@
+import re # regex
+import string
+
+"""
+URL Normalization
+
+Scheme and host of URL are case-insensitive (RFC 3986), so they can be uppercased without changing the URL.
+Then they are alphanumeric mode characters, 5.5 bits per character instead of 8 bits in byte mode.
+Hex digits of percent-encoding ("%2f" -> "%2F") are also uppercased.
+Only ASCII letters are uppercased (Unicode case mapping changes the domain, e.g. "ß" -> "SS").
+Path, query, fragment & user information are case-sensitive, so they are left as is.
+
+
+### normalizeUrl() function ###
+Uppercase case-insensitive parts of URL.
+If "dataString" is not URL ("scheme://..."), it is returned as is.
+
+Parameters
+- dataString: str
+    String data to encode.
+
+Return
+- str
+    Normalized string.
+"""
+
+
+#------------------------------
+# Regular Expression
+#   scheme "://" authority (path, query & fragment)
+#------------------------------
+Url_Regex = re.compile("([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)(.*)$", re.DOTALL)
+PercentEncoding_Regex = re.compile("%[0-9A-Fa-f]{2}")
+
+# "a" ~ "z" -> "A" ~ "Z", other characters are left as is.
+AsciiUpper_Table = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+
+####################################################################################################
+# Normalize URL
+####################################################################################################
+def normalizeUrl(dataString: str):
+    match = Url_Regex.match(dataString)
+    if match is None:
+        return dataString
+
+    scheme, authority, rest = match.groups()
+
+    # Authority: [userinfo "@"] host [":" port], only host is case-insensitive.
+    userInfo, at, host = authority.rpartition("@")
+    authority = userInfo + at + host.translate(AsciiUpper_Table)
+
+    # Percent-encoding
+    rest = PercentEncoding_Regex.sub(lambda found: found.group(0).upper(), rest)
+
+    return scheme.translate(AsciiUpper_Table) + "://" + authority + rest